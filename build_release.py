@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+
+from preprocessing_population_data import build_release, LICZBA_ZAKLADEK, RELEASES_DIR
+
+# Nowe wydanie tablic GUS z pliku populacyjnego (zakladki rok-16..rok), np. po publikacji tablic za 2023:
+#   python build_release.py population_data_2023.xlsx 2023
+# Tablice trafiaja do data/releases/<rok>/ - program uzywa ich dla pacjentow operowanych od tego roku.
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a release of the general population life tables used for patients "
+                    "operated on in the given year or later.")
+    parser.add_argument("population", help=f"population data workbook (xlsx) with one sheet per year, "
+                                           f"the {LICZBA_ZAKLADEK} sheets YEAR-{LICZBA_ZAKLADEK - 1}..YEAR are used")
+    parser.add_argument("year", type=int, help="release year (last sheet used)")
+    parser.add_argument("--releases-dir", default=None,
+                        help=f"directory with releases (default: {RELEASES_DIR} next to the program)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    population = os.path.abspath(args.population)
+    releases_dir = os.path.abspath(args.releases_dir) if args.releases_dir else None
+    # domyslnie data/releases w katalogu programu, jak w oknie i cli.py
+    os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
+
+    try:
+        files = build_release(population, args.year, releases_dir or RELEASES_DIR)
+    except (OSError, KeyError, ValueError) as e:  # KeyError - brak zakladki roku w pliku
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    for path in files.values():
+        print(os.path.abspath(path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from PySide6.QtCore import QTimer
+
+
+class CanvasRedraw:
+    """Odswiezanie wykresu po zmianach z edytora - rysowanie odlozone do konca obslugi zdarzenia.
+
+    full()  - zmiana osi, linii, legendy, czcionek: jedno pelne rysowanie,
+    texts() - zmiana tylko napisow na osiach (liczby pacjentow w ryzyku): tlo wykresu bez napisow i legendy
+              jest zapamietywane, a potem rysowane sa tylko napisy i legenda i blit; gotowa klatka kazdego
+              stanu widocznosci napisow tez, wiec ponowne ukrycie / pokazanie liczb to tylko blit.
+    Kilka zmian w jednym zdarzeniu (np. zakres osi i ukrycie liczb) daje jedno rysowanie. Kazde inne
+    rysowanie canvasu (nowa krzywa, zmiana rozmiaru okna) uniewaznia zapamietane tlo; disconnect() przy
+    zamknieciu edytora odlacza ten nasluch od canvasu (canvas zyje dluzej niz edytor).
+    """
+
+    def __init__(self, figure):
+        self.figure = figure
+        self._full = False
+        self._texts = False
+        self._scheduled = False
+        self._canvas = None
+        self._cid = None  # id nasluchu draw_event na self._canvas
+        self._background = None
+        self._frames = {}  # gotowe klatki wg widocznosci napisow - ponowne przelaczenie bez rysowania
+        self._capturing = False
+
+    def full(self):
+        self._full = True
+        self._schedule()
+
+    def texts(self):
+        self._texts = True
+        self._schedule()
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            QTimer.singleShot(0, self.flush)
+
+    def flush(self):
+        """Wykonuje zalegle rysowanie od razu (wywolywane tez z timera)."""
+        self._scheduled = False
+        full, texts = self._full, self._texts
+        self._full = self._texts = False
+        canvas = self.figure.canvas  # canvas Qt moze powstac juz po zmianie (Figure tworzona przed canvasem)
+        if full or (texts and not hasattr(canvas, 'copy_from_bbox')):
+            canvas.draw()
+        elif texts:
+            self._blit_texts(canvas)
+
+    def disconnect(self):
+        """Odlacza nasluch draw_event i zapomina tlo; kolejne texts() podlacza go od nowa."""
+        if self._cid is not None:
+            self._canvas.mpl_disconnect(self._cid)
+        self._canvas = None
+        self._cid = None
+        self._background = None
+        self._frames = {}
+
+    def _invalidate(self, event):
+        if not self._capturing:
+            self._background = None
+            self._frames = {}
+
+    def _blit_texts(self, canvas):
+        if canvas is not self._canvas:
+            self.disconnect()
+            self._cid = canvas.mpl_connect('draw_event', self._invalidate)
+            self._canvas = canvas
+
+        overlay = [artist for ax in self.figure.axes for artist in ax.texts + [ax.get_legend()] if artist is not None]
+        state = tuple(artist.get_visible() for artist in overlay)
+        if state in self._frames:
+            canvas.restore_region(self._frames[state])
+            canvas.blit(self.figure.bbox)
+            return
+
+        if self._background is None:
+            # tlo: pelne rysowanie bez napisow i legend (legenda polprzezroczysta - rysowana tylko raz, nad napisami)
+            for artist in overlay:
+                artist.set_visible(False)
+            self._capturing = True
+            try:
+                canvas.draw()
+            finally:
+                self._capturing = False
+                for artist, was_visible in zip(overlay, state):
+                    artist.set_visible(was_visible)
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+        else:
+            canvas.restore_region(self._background)
+
+        for ax in self.figure.axes:
+            for text in ax.texts:
+                ax.draw_artist(text)  # ukryte napisy nie sa rysowane
+            legend = ax.get_legend()
+            if legend is not None:
+                ax.draw_artist(legend)
+        if len(self._frames) >= 4:
+            self._frames = {}
+        self._frames[state] = canvas.copy_from_bbox(self.figure.bbox)
+        canvas.blit(self.figure.bbox)
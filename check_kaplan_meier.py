@@ -0,0 +1,83 @@
+import sys
+
+import numpy as np
+
+from kaplan_meier import GroupedKaplanMeier, kaplan_meier
+
+# Porownanie wlasnego estymatora KM z lifelines (wczesniej uzywanym w programie) na losowych danych:
+#   pip install lifelines
+#   python check_kaplan_meier.py
+# Kod wyjscia 1 - roznica wieksza niz TOLERANCE albo brak bledu dla danych z brakami.
+
+TOLERANCE = 1e-12
+
+
+def samples(seed=0):
+    """Zbiory testowe (nazwa, czasy, zdarzenia): remisy, sama cenzura, same zgony, jeden pacjent, duzy zbior."""
+    rng = np.random.default_rng(seed)
+    yield 'ties', np.round(rng.exponential(5, 1000), 1), rng.integers(0, 2, 1000)
+    yield 'continuous', rng.exponential(8, 500), rng.integers(0, 2, 500)
+    yield 'all censored', np.round(rng.uniform(0, 10, 200), 2), np.zeros(200, dtype=int)
+    yield 'all events', np.round(rng.uniform(0, 10, 200), 2), np.ones(200, dtype=int)
+    yield 'zero times', np.r_[np.zeros(20), np.round(rng.uniform(0, 5, 80), 1)], rng.integers(0, 2, 100)
+    yield 'one patient', np.array([3.5]), np.array([1])
+    yield 'large', np.round(rng.exponential(8, 100000), 3), rng.integers(0, 2, 100000)
+
+
+def differences(fit, reference):
+    """Najwieksze roznice (os czasu, przezycie, w ryzyku, granice przedzialu ufnosci) wzgledem KaplanMeierFitter."""
+    timeline = reference.survival_function_.index.to_numpy()
+    if len(timeline) != len(fit.times):
+        return {'timeline length': abs(len(timeline) - len(fit.times))}
+    ci = reference.confidence_interval_.to_numpy()
+    lower, upper = fit.confidence_interval()
+    return {
+        'timeline': np.max(np.abs(timeline - fit.times)),
+        'survival': np.max(np.abs(reference.survival_function_.to_numpy()[:, 0] - fit.survival)),
+        'at risk': np.max(np.abs(reference.event_table['at_risk'].to_numpy() - fit.at_risk)),
+        'ci lower': np.max(np.abs(ci[:, 0] - lower)),
+        'ci upper': np.max(np.abs(ci[:, 1] - upper)),
+    }
+
+
+def main():
+    try:
+        from lifelines import KaplanMeierFitter
+    except ImportError:
+        print("lifelines is required for this check: pip install lifelines")
+        return 1
+
+    worst = 0.0
+    for name, times, events in samples():
+        reference = KaplanMeierFitter().fit(times, event_observed=events)
+        checks = {'kaplan_meier': kaplan_meier(times, events)}
+        # podgrupa z GroupedKaplanMeier - polowa pacjentow wybrana maska, numerami wierszy i etykieta
+        grouped = GroupedKaplanMeier(np.r_[times, times + 0.05], np.r_[events, events])
+        mask = np.r_[np.ones(len(times), dtype=bool), np.zeros(len(times), dtype=bool)]
+        checks['GroupedKaplanMeier.fit'] = grouped.fit(mask)
+        checks['GroupedKaplanMeier.fit_rows'] = grouped.fit_rows(np.arange(len(times)))
+        checks['GroupedKaplanMeier.fit_groups'] = grouped.fit_groups(np.where(mask, 'a', 'b'))['a']
+        for method, fit in checks.items():
+            diff = differences(fit, reference)
+            largest = max(diff.values())
+            worst = max(worst, largest)
+            status = "ok" if largest <= TOLERANCE else "MISMATCH " + ", ".join(f"{k}: {v:.3g}" for k, v in diff.items())
+            print(f"{name:>12}  {method:<30} max diff {largest:.2g}  {status}")
+
+    failed = worst > TOLERANCE
+    for label, times, events in [('NaN time', np.array([1.0, np.nan, 2.0]), np.array([1, 0, 1])),
+                                 ('NaN event', np.array([1.0, 1.5, 2.0]), np.array([1, np.nan, 1]))]:
+        try:
+            kaplan_meier(times, events)
+        except ValueError:
+            print(f"{label}: rejected")
+        else:
+            print(f"{label}: NOT rejected")
+            failed = True
+
+    print(f"Largest difference from lifelines: {worst:.2g} (tolerance {TOLERANCE:g})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+
+from engine import load_strata, run_batch, AT_RISK_STEP
+from parallel import process_pool
+from survival_tests import TEST_NAMES
+
+# Analiza wielu warstw bez okna, np. w nocnym zadaniu:
+#   python cli.py dane.csv warstwy.yaml --tests AUC "Relative survival" --report nocny
+# warstwy.yaml - lista warstw, kazda to kolumna: zakres jak w oknie Set range, np.
+#   - {age: 60-70, sex: 1-1}
+#   - {group: "SVG,MVG"}
+#   - {}                      # wszyscy pacjenci (no preferences)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="POMOKA batch analysis: Kaplan-Meier curves of patient strata compared with the "
+                    "age- and sex-matched general population, without the GUI.")
+    parser.add_argument("data", help="patient data file (csv, xlsx, xls, parquet, feather, arrow)")
+    parser.add_argument("strata", help="JSON or YAML list of strata, each a mapping column: range "
+                                       "('60-70' or 'SVG,MVG', as in Set range); {} - all patients")
+    parser.add_argument("--tests", nargs="+", default=TEST_NAMES, choices=TEST_NAMES, metavar="TEST",
+                        help=f"tests to run (default: all): {', '.join(TEST_NAMES)}")
+    parser.add_argument("--header-row", type=int, default=1, help="row with column names (default: 1)")
+    parser.add_argument("--time-column", default="time", help="follow-up time column (default: time)")
+    parser.add_argument("--event-column", default="event", help="event column (default: event)")
+    parser.add_argument("--output-dir", default="plots", help="directory for reports (default: plots)")
+    parser.add_argument("--report", default="report", help="report name (default: report)")
+    parser.add_argument("--at-risk-step", type=float, default=AT_RISK_STEP,
+                        help=f"years between patients-at-risk numbers on the chart, e.g. 1 or 0.0833 (monthly) "
+                             f"(default: {AT_RISK_STEP})")
+    parser.add_argument("--serial", action="store_true", help="compute in this process, without the process pool")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)  # stdout - tylko wyniki
+    if args.at_risk_step <= 0:
+        print("Error: --at-risk-step must be positive", file=sys.stderr)
+        return 1
+    data = os.path.abspath(args.data)
+    strata_file = os.path.abspath(args.strata)
+    output_dir = os.path.abspath(args.output_dir)
+    # tablice GUS i cache plikow w katalogu programu, jak w oknie
+    os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
+
+    reported = set()
+
+    def progress(done, total, unit):  # gotowe warstwy na stderr, kazdy stan raz
+        if unit == 'strata' and total and done not in reported:
+            reported.add(done)
+            print(f"  {done}/{total} {unit}", file=sys.stderr, flush=True)
+
+    try:
+        strata = load_strata(strata_file)
+        batch = run_batch(data, strata, args.tests, args.header_row, args.time_column, args.event_column,
+                          output_dir, args.report, executor=None if args.serial else process_pool(),
+                          progress=progress, at_risk_step=args.at_risk_step)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    curve_id = None
+    for stratum, message in batch['messages']:
+        if stratum != curve_id:
+            curve_id = stratum
+            print(f"[{curve_id or 'all patients'}]")
+        print(f"  {message}")
+    for stratum in batch['skipped']:
+        print(f"No data matching the ranges: {stratum or 'all patients'}", file=sys.stderr)
+    for stratum in batch['not_drawn']:
+        print(f"Not drawn on the chart (no more unique colors): {stratum}", file=sys.stderr)
+    print(f"Report: {batch['report']}")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
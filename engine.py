@@ -0,0 +1,704 @@
+import importlib
+import json
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.patheffects import withStroke
+
+from expected_survival import matched_curves, patient_covariates, AGE_COLUMNS, MALE_COLUMNS, FEMALE_COLUMNS
+from ingestion import ParsedFileCache, SourceFile, CsvStream, ColumnarFile, _no_progress
+from kaplan_meier import GroupedKaplanMeier, kaplan_meier, plot_kaplan_meier
+from label_layout import LabelLayout
+from parallel import gather, warm_up_pool
+from preprocessing_population_data import (prepare_data, save_data_to_excel, LifeTableStore, REFERENCE_YEAR,
+                                           survival_curve, mean_survival_curve, combine_curves)
+from stratification import StratificationIndex
+from survival_tests import run_tests, RELATIVE_SURVIVAL
+
+# Analiza bez GUI - te same obliczenia co Execute / Add next curve w POMOKAstat, bez PySide6.
+# Okno i wiersz polecen (cli.py) korzystaja z tych samych funkcji, wiec wyniki i raporty sa identyczne.
+
+# kolumny z rokiem operacji (data indeksowa) - wybor wydania tablic GUS dla pacjenta
+INDEX_YEAR_COLUMNS = ['index_year', 'surgery_year', 'year_of_surgery', 'rok_operacji']  # kolejnosc = priorytet
+
+# kolory kolejnych krzywych na wykresie (pierwsza krzywa i krzywa GUS zajmuja dwa pierwsze)
+CURVE_COLORS = [
+    '#1f77b4',  # niebieski
+    '#ff7f0e',  # pomaranczowy
+    '#2ca02c',  # zielony
+    '#d62728',  # czerwony
+    '#9467bd',  # fioletowy
+    '#8c564b',  # brazowy
+    '#e377c2',  # rozowy
+    '#7f7f7f',  # szary
+]
+# moduly ladowane dopiero przy pierwszym tescie / raporcie (kilka sekund importu przy starcie programu)
+LAZY_MODULES = ['scipy.interpolate', 'scipy.stats', 'statsmodels.stats.multicomp', 'seaborn', 'fpdf']
+# moduly potrzebne procesom puli do testow i replikacji bootstrap
+POOL_MODULES = ['survival_tests', 'relative_survival', 'scipy.interpolate', 'scipy.stats']
+AT_RISK_STEP = 2  # liczba pacjentow w ryzyku na wykresie co 2 lata
+AT_RISK_MIN_STEP = 1 / 12  # gestszy skok osi X w edytorze wykresu - liczby pacjentow nadal co miesiac
+NEXT_CURVE_OFFSET = 0.2 / 3  # przesuniecie w pionie liczb pacjentow kolejnych krzywych
+
+# komunikaty raportu (ANOVA, Tukey, zapisane pliki) - cli.py wypisuje je na stderr
+log = logging.getLogger(__name__)
+
+
+def warm_up(pool=True):
+    """Laduje LAZY_MODULES z wyprzedzeniem, a z pool - uruchamia tez procesy puli z POOL_MODULES.
+
+    Do wywolania w watku w tle zaraz po pokazaniu okna: pierwszy test czy raport nie czeka wtedy na importy.
+    """
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+    if pool:
+        warm_up_pool(POOL_MODULES)
+
+
+class TestResultsStorage:
+    def __init__(self):
+        self.results = {}  # Struktura: {"Test_Name": {"Curve_ID": {"Metric": value}}}
+
+    def add_result(self, test_name, curve_id, result_dict):
+        if test_name not in self.results:
+            self.results[test_name] = {}
+        self.results[test_name][curve_id] = result_dict
+
+    def get_result(self, test_name, curve_id):
+        return self.results.get(test_name, {}).get(curve_id, None)
+
+    def get_all_results(self):
+        return self.results
+
+
+class DataResultsStorage:
+    def __init__(self):
+        self.results = {}
+
+    def add_data(self, curve_id, data):
+        self.results[curve_id] = data
+
+    def get_all_data(self):
+        return self.results
+
+
+class RangeError(ValueError):
+    """Niepoprawny zakres kolumny; title - tytul ostrzezenia w oknie."""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+
+
+class Dataset:
+    """Wczytane dane pacjentow do filtrowania warstw i liczenia KM.
+
+    df - caly zbior (dla duzego CSV i plikow kolumnowych sam naglowek), stream - CsvStream/ColumnarFile
+    albo None, index - StratificationIndex (albo stream) do zakresow z parse_range.
+    """
+
+    def __init__(self, df, stream=None, index=None):
+        self.df = df
+        self.stream = stream
+        self.index = index if index is not None else StratificationIndex(df)
+        self._groups = {}
+
+    def analysis_columns(self, time_column, event_column):
+        """Kolumny czytane z duzego CSV/pliku kolumnowego: czas, zdarzenie i cechy pacjenta do tablic GUS (wiek, plec, rok operacji)."""
+        covariates = AGE_COLUMNS + MALE_COLUMNS + FEMALE_COLUMNS + INDEX_YEAR_COLUMNS
+        return [time_column, event_column] + [column for column in self.df.columns
+                                              if str(column).strip().lower() in covariates]
+
+    def select(self, column_ranges, time_column, event_column):
+        """Wiersze warstwy.
+
+        Dane w pamieci - wiersze z indeksu (numery wierszy pliku), bez kopii calego zbioru; duzy CSV - jedno
+        przejscie kawalkami, Parquet/Feather/Arrow - skan z filtrem zakresow, w obu tylko kolumny potrzebne do analizy.
+        """
+        if self.stream is not None:
+            return self.stream.select(column_ranges, self.analysis_columns(time_column, event_column))
+        return self.df.iloc[self.index.rows(column_ranges)]
+
+    def groups(self, time_column, event_column):
+        """KM dla podgrup danych w pamieci - sortowanie po czasie raz na pare kolumn time/event."""
+        key = (time_column, event_column)
+        if key not in self._groups:
+            self._groups[key] = GroupedKaplanMeier(self.df[time_column], self.df[event_column])
+        return self._groups[key]
+
+    def kaplan_meier(self, df_filtered, times, events):
+        """KM warstwy - z posortowanych raz danych w pamieci albo wprost z wczytanych wierszy."""
+        if self.stream is not None:
+            return kaplan_meier(times, event_observed=events)
+        return self.groups(times.name, events.name).fit_rows(df_filtered.index.to_numpy())
+
+
+def valid_headers(df):
+    headers = df.columns.tolist()
+    return all(isinstance(header, str) and header.strip() != "" for header in headers)
+
+
+def load_dataset(file_name, header_row, source):
+    """Dane pliku (mozna wywolac w watku roboczym): (Dataset, opis liczby wierszy)."""
+    if source.columnar:
+        # Parquet/Feather/Arrow - w pamieci tylko schemat, krzywe czytaja potrzebne kolumny i wiersze
+        stream = ColumnarFile(file_name)
+        return Dataset(stream.header, stream, stream), stream.n_rows
+    if source.streamed:
+        # duzy CSV - w pamieci tylko naglowek, krzywe czytaja plik kawalkami
+        stream = CsvStream(file_name, header_row)
+        return Dataset(stream.header, stream, stream), "read in chunks (large file)"
+    df = source.frame(header_row)
+    return Dataset(df), df.shape[0]
+
+
+def open_dataset(file_name, header_row, cache=None, progress=_no_progress):
+    """Wczytanie pliku z weryfikacja naglowka (ValueError, gdy wiersz header_row nie jest naglowkiem)."""
+    source = SourceFile(file_name, cache, progress)
+    if not valid_headers(source.preview(header_row)):
+        raise ValueError(f"Row {header_row} of {file_name} does not contain valid headers.")
+    return load_dataset(file_name, header_row, source)
+
+
+def parse_range(column, value_range, index):
+    """Zakres kolumny z tekstu jak w setRanges: 'MIN-MAX' -> ('numeric', (min, max)), 'a,b' -> ('categorical', [a, b]).
+
+    index - StratificationIndex albo stream danych (rows, unique_values). Niepoprawny zakres - RangeError.
+    """
+    try:
+        # Check if input is a numeric range (e.g., "1-10")
+        if '-' in value_range:
+            # Ensure the format is strictly numeric (e.g., "min-max")
+            if not re.match(r"^\d+-\d+$", value_range.strip()):
+                raise RangeError("Format Error",
+                                 f"Invalid range format for column '{column}'. Please enter a valid numeric range: MINIMUM-MAXIMUM.")
+            lower, upper = map(int, value_range.split('-'))
+
+            # Check if lower bound is less than or equal to upper bound
+            if lower > upper:
+                raise RangeError("Range Error",
+                                 f"Invalid range: the lower bound ({lower}) cannot be greater than the upper bound ({upper}).")
+            if not len(index.rows({column: ('numeric', (lower, upper))})):
+                raise RangeError("Range Error",
+                                 f"No values found in column '{column}' for the range: {lower}-{upper}.")
+            return 'numeric', (lower, upper)
+
+        # Check if input is a comma-separated list of values (e.g., "SVG,MVG")
+        if ',' in value_range or value_range.strip():
+            value_list = [val.strip() for val in value_range.split(',')]
+
+            # Verify if all entered values exist in the column
+            values = [str(value) for value in index.unique_values(column)]
+            if not set(value_list).issubset(set(values)):
+                raise RangeError("Value Error", f"Some values in '{value_range}' do not exist in column '{column}'.")
+            return 'categorical', value_list
+    except RangeError:
+        raise
+    except ValueError:
+        raise RangeError("Input Error",
+                         "Invalid input. Please enter a valid numeric range or a comma-separated list of values.")
+    raise RangeError("Input Error", "Please enter a valid range (e.g., 'MINIMUM-MAXIMUM' or 'value1,value2,...').")
+
+
+def population_selection(column_ranges):
+    """Wiek i plec krzywej GUS z zakresow kolumn wieku i plci (jak w setRanges).
+
+    sex - 0 mezczyzni, 1 kobiety, 2 ogolne; option 1 - jeden rocznik (age), 2 - zakres age_start..age_end.
+    """
+    selection = {'sex': 2, 'option': 2, 'age': None, 'age_start': 0, 'age_end': 100}
+    for column, (kind, bounds) in column_ranges.items():
+        if kind != 'numeric':
+            continue
+        lower, upper = bounds
+        name = column.lower()
+        if name in AGE_COLUMNS:
+            if lower == upper:
+                selection['age'] = lower
+                selection['option'] = 1
+            else:
+                selection['age_start'] = lower
+                selection['age_end'] = upper
+                selection['option'] = 2
+        if name in MALE_COLUMNS:
+            if lower != upper:
+                selection['sex'] = 2
+            elif lower == 1:
+                selection['sex'] = 0  # 0=dane_mezczyzn
+            elif lower == 0:
+                selection['sex'] = 1  # 1=dane_kobiet
+        if name in FEMALE_COLUMNS:
+            if lower != upper:
+                selection['sex'] = 2
+            elif lower == 1:
+                selection['sex'] = 1
+            elif lower == 0:
+                selection['sex'] = 0
+    return selection
+
+
+def describe_ranges(column_ranges, columns=None):
+    """Opis warstwy do legendy i identyfikator krzywej w wynikach, np. 'age: 60-70; group: SVG, MVG'."""
+    columns = column_ranges if columns is None else columns
+    return "; ".join(
+        f"{column}: {column_ranges[column][1][0]}-{column_ranges[column][1][1]}"
+        if column_ranges[column][0] == 'numeric' else f"{column}: {', '.join(column_ranges[column][1])}"
+        for column in columns if column in column_ranges
+    )
+
+
+def index_years(df):
+    """Rok operacji (data indeksowa) kazdego pacjenta albo None, gdy brak takiej kolumny.
+
+    Przy kilku pasujacych kolumnach wygrywa pierwsza z INDEX_YEAR_COLUMNS, niezaleznie od kolejnosci w pliku.
+    """
+    columns = {}
+    for column in df.columns:
+        columns.setdefault(str(column).strip().lower(), column)
+    for name in INDEX_YEAR_COLUMNS:
+        if name in columns:
+            return pd.to_numeric(df[columns[name]], errors='coerce').to_numpy(dtype=float)
+    return None
+
+
+def population_releases(life_tables, years=None):
+    """Wydania tablic GUS pasujace do lat operacji pacjentow oraz liczba pacjentow dla kazdego."""
+    if years is not None:
+        years = years[~np.isnan(years)]
+        if len(years):
+            return np.unique(life_tables.releases_for(years.astype(int)), return_counts=True)
+    # brak roku operacji - najnowsze domyslne wydanie
+    return np.array([REFERENCE_YEAR]), np.array([1])
+
+
+def ensure_population_files(life_tables, base_dir=''):
+    """Tworzy tablice GUS po preprocessingu, jesli ich nie ma (w przyszlosci przyda sie do aktualizacji danych)."""
+    file_path = os.path.join(base_dir, "data/population_data.xlsx")
+    file_path_men = os.path.join(base_dir, "data/preprocessed_male.xlsx")
+    file_path_women = os.path.join(base_dir, "data/preprocessed_female.xlsx")
+    file_path_all = os.path.join(base_dir, "data/preprocessed_general.xlsx")
+    if not os.path.exists(file_path_men) or not os.path.exists(file_path_women) or not os.path.exists(
+            file_path_all):
+        tab_m, tab_k = prepare_data(file_path)
+        save_data_to_excel(file_path_men, file_path_women, file_path_all, tab_m, tab_k)
+        life_tables.clear()
+
+
+def population_curve(life_tables, selection, last_time_km, years=None, base_dir=''):
+    """Krzywa GUS dla wieku i plci z population_selection; years - lata operacji pacjentow (wydania tablic).
+
+    Zwraca (x_data, y_data, y_data_probability, x_data_trimmed, y_data_probability_trimmed).
+    """
+    ensure_population_files(life_tables, base_dir)
+    sex = selection['sex']
+    releases, counts = population_releases(life_tables, years)
+
+    # zakres 65-70 to rocznik start = wydanie - 70, a end = wydanie - 65, a wiec na odwrot
+    if selection['option'] == 1:
+        # jedna krzywa na wydanie (x - lata, y - procenty przezycia), wazona liczba pacjentow
+        curves = [survival_curve(sex, release - selection['age'], life_tables.table(release))
+                  for release in releases]
+    else:
+        # srednia dla zakresu rocznikow, osobno dla kazdego wydania
+        curves = [mean_survival_curve(sex, release - selection['age_end'], release - selection['age_start'],
+                                      life_tables.table(release))
+                  for release in releases]
+    x_data, y_data = combine_curves(curves, counts) if len(curves) > 1 else curves[0]
+    # przeksztalcenie procentow przezycia na prawdopodobienstwa (0-1)
+    y_data_probability = y_data / 100
+
+    # przycinanie osi X do dlugosci KM (tylko dla testow)
+    valid_indices = x_data <= last_time_km
+    return x_data, y_data, y_data_probability, x_data[valid_indices], y_data_probability[valid_indices]
+
+
+def curve_results(dataset, column_ranges, time_column, event_column, tests, life_tables, selection,
+                  population=None, base_dir='', progress=_no_progress, executor=None):
+    """Obliczenia jednej krzywej: filtrowanie, KM, krzywa GUS i wybrane testy.
+
+    population - krzywa GUS z population_curve (None - liczona dla tej krzywej), executor - pula procesow
+    dla testow. Zwraca {'patients', 'km', 'population', 'tests'} albo None, gdy brak pacjentow.
+    """
+    df_filtered = dataset.select(column_ranges, time_column, event_column)
+    if df_filtered.empty:
+        return None
+    patients = (df_filtered, df_filtered[time_column], df_filtered[event_column])
+    km = dataset.kaplan_meier(*patients)
+    if population is None:
+        progress(0, 0, 'population data')
+        population = population_curve(life_tables, selection, km.times[-1], index_years(df_filtered), base_dir)
+
+    curve = {'time_points': km.times, 'survival': km.survival, 'gus_times': population[3],
+             'gus_survival': population[4]}
+    cohort = None
+    progress(0, len(tests), 'tests')
+    if RELATIVE_SURVIVAL in tests:
+        try:
+            ages, sexes = patient_covariates(df_filtered)
+        except ValueError:
+            expected_curves = None  # bez kolumny wieku tylko przezycie wzgledne
+        else:
+            expected_curves = matched_curves(life_tables, ages, sexes, index_years(df_filtered))
+        cohort = (patients[1].to_numpy(dtype=float), patients[2].to_numpy(dtype=bool), expected_curves)
+    return {'patients': patients, 'km': km, 'population': population,
+            'tests': run_tests(tests, curve, cohort, progress, executor=executor)}
+
+
+def curve_color(ax):
+    """Kolor kolejnej krzywej (None - brak wolnych kolorow)."""
+    existing_lines = len(ax.lines)
+    if existing_lines >= len(CURVE_COLORS):
+        return None
+    return CURVE_COLORS[existing_lines]
+
+
+def at_risk_ticks(last_time, step=AT_RISK_STEP):
+    """Chwile od 0 do last_time co step lat (AT_RISK_STEP, 1 - co rok, relative_survival.MONTH - co miesiac)."""
+    return np.arange(int(np.floor(last_time / step + 1e-9)) + 1) * step
+
+
+def number_at_risk(km, step=AT_RISK_STEP):
+    """Liczba pacjentow w ryzyku co step lat do konca krzywej - wspolna dla napisow na wykresie i tabeli.
+
+    Wartosci z punktu osi czasu KM najblizszego kazdej chwili, dla wszystkich chwil jednym searchsorted.
+    Zwraca (chwile, liczba w ryzyku, przezycie w tych punktach).
+    """
+    ticks = at_risk_ticks(km.times[-1], step)
+    closest = km.nearest_indices(ticks)
+    return ticks, km.at_risk[closest], km.survival[closest]
+
+
+def tick_label(t):
+    """Chwila jako naglowek tabeli: '0', '2', '0.08' (miesiac)."""
+    return format(round(float(t), 2), 'g')
+
+
+def at_risk_layout(step=AT_RISK_STEP):
+    """LabelLayout na liczby pacjentow w ryzyku co step lat; szerokosc napisu w skali skoku (0.5 przy 2 latach)."""
+    return LabelLayout(width=0.25 * step)
+
+
+def draw_first_at_risk(ax, km, color, step=AT_RISK_STEP, layout=None):
+    """Liczby pacjentow w ryzyku pierwszej krzywej nad krzywa co step lat; zwraca number_at_risk (do tabeli).
+
+    layout - LabelLayout wykresu: zapamietuje napisy, ktore omijaja liczby kolejnych krzywych.
+    """
+    initial_offset_x = 0.25 * step
+    at_risk = number_at_risk(km, step)
+    for t, n, survival_at_t in zip(*at_risk):
+        if layout is not None:
+            layout.add(t + initial_offset_x, survival_at_t + 0.05)
+        ax.text(t + initial_offset_x, survival_at_t + 0.05,
+                str(n),
+                ha='center', fontsize=8, fontweight='bold',
+                color=color, alpha=0.9,
+                verticalalignment='bottom',
+                path_effects=[withStroke(linewidth=3, foreground="white")])
+    return at_risk
+
+
+def draw_first_curve(ax, km, label, step=AT_RISK_STEP, layout=None):
+    """Pierwsza krzywa KM z liczba pacjentow w ryzyku nad krzywa co step lat; zwraca number_at_risk (do tabeli)."""
+    plot_kaplan_meier(ax, km, label=label)
+    ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)
+    at_risk = draw_first_at_risk(ax, km, ax.lines[-1].get_color(), step, layout)
+
+    ax.set_xlabel('Time [years]')
+    ax.set_ylabel('Survival Probability')
+    ax.grid(True)
+    return at_risk
+
+
+def draw_population_curve(ax, population):
+    """Krzywa GUS (przycieta do dlugosci KM) na wykresie KM."""
+    ax.step(population[3], population[4], where='post', label='POPULATION DATA', linestyle='-', color='orange')
+
+
+def draw_next_at_risk(ax, km, color, offset, step=AT_RISK_STEP, layout=None):
+    """Liczby pacjentow w ryzyku kolejnej krzywej co step lat, przesuniete w pionie o offset i odsuniete od
+    juz narysowanych.
+
+    layout - LabelLayout wykresu (napisy wszystkich krzywych); bez niego liczby omijaja tylko napisy tej krzywej.
+    Zwraca number_at_risk krzywej.
+    """
+    if layout is None:
+        layout = at_risk_layout(step)
+    initial_offset_x = -0.15 * step
+    at_risk = number_at_risk(km, step)
+    for t, n, survival_at_t in zip(*at_risk):
+        adjusted_x = t + initial_offset_x
+        adjusted_y = survival_at_t - offset
+        # przesuniecie w gore ponad wczesniej dodane napisy
+        adjusted_y = layout.free_y(adjusted_x, adjusted_y)
+
+        # Odbicie tekstu, jesli Y jest ponizej 0.05
+        if adjusted_y < 0.05:
+            adjusted_y = abs(adjusted_y)
+            if adjusted_y > 0.15:
+                adjusted_y -= 0.10
+            adjusted_x += 0.3 * step
+
+        ax.text(adjusted_x, adjusted_y,
+                str(n),
+                ha='center', fontsize=8, fontweight='bold',
+                color=color, alpha=0.9,
+                verticalalignment='bottom',
+                path_effects=[withStroke(linewidth=3, foreground="white")])
+        layout.add(adjusted_x, adjusted_y)
+    return at_risk
+
+
+def draw_next_curve(ax, km, label, color, offset, step=AT_RISK_STEP, layout=None):
+    """Kolejna krzywa KM z liczbami pacjentow w ryzyku (draw_next_at_risk); zwraca number_at_risk krzywej."""
+    plot_kaplan_meier(ax, km, label=label, color=color)
+    ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)
+    last_time_km = km.times[-1]
+
+    # przedluzenie osi X w razie potrzeby
+    current_xlim = ax.get_xlim()
+    if last_time_km > current_xlim[1]:
+        ax.set_xlim(current_xlim[0], last_time_km + 0.5)
+
+    return draw_next_at_risk(ax, km, color, offset, step, layout)
+
+
+def set_time_range(ax, x_min, x_max):
+    """Zakres osi X; liczby pacjentow poza zakresem sa ukrywane."""
+    ax.set_xlim(x_min, x_max)
+    for text in ax.texts:
+        x, _ = text.get_position()
+        text.set_visible(x_min <= x <= x_max)
+
+
+def anova_and_tukey_heatmap(data_results_storage, heatmap_path):
+    """ANOVA krzywych z DataResultsStorage; przy istotnych roznicach macierz p-value testu Tukeya jako heatmapa."""
+    # ciezkie moduly tylko do raportu - ladowane przy pierwszym raporcie albo w warm_up
+    import seaborn as sns
+    from scipy import stats
+    from statsmodels.stats.multicomp import pairwise_tukeyhsd
+
+    data_groups = data_results_storage.get_all_data()
+    labels = list(data_groups.keys())
+    values = list(data_groups.values())
+
+    anova_stat, anova_p_value = stats.f_oneway(*values)
+    log.info("ANOVA: Statystyka F = %.4f, p-value = %.4f", anova_stat, anova_p_value)
+
+    if anova_p_value >= 0.05:
+        log.info("Brak istotnych różnic między grupami.")
+        return anova_stat, anova_p_value, None, None
+
+    log.info("ANOVA wykazała istotne różnice – uruchamiam test Tukeya HSD...")
+    data = []
+    group_labels = []
+    for label, values in data_groups.items():
+        data.extend(values)
+        group_labels.extend([label] * len(values))
+
+    tukey = pairwise_tukeyhsd(np.array(data), np.array(group_labels), alpha=0.05)
+
+    log.info("Tabela wyników Tukeya:\n%s", tukey.summary())
+
+    tukey_matrix = pd.DataFrame(index=labels, columns=labels, dtype=float)
+    for result in tukey.summary().data[1:]:
+        g1, g2, _, p, _, *_ = result
+        tukey_matrix.loc[g1, g2] = p
+        tukey_matrix.loc[g2, g1] = p
+
+    # Figure poza menedzerem pyplot - bezpieczna w watku roboczym i w procesie bez GUI;
+    # blad zapisu przerywa raport (cli konczy sie kodem bledu, okno pokazuje komunikat)
+    fig = Figure(figsize=(8, 6))
+    ax = fig.add_subplot()
+    sns.heatmap(tukey_matrix, annot=True, cmap="coolwarm", center=0.05, linewidths=0.5, vmin=0, vmax=1, ax=ax)
+    ax.set_title("Macierz testu Tukeya (p-value)")
+    fig.savefig(heatmap_path, bbox_inches="tight", dpi=150)
+    log.info("Heatmapa zapisana w: %s", heatmap_path)
+
+    return anova_stat, anova_p_value, tukey_matrix, heatmap_path
+
+
+def write_report(output_dir, report_name, output_format, results_storage, data_storage, figure):
+    """Raport jak z Generate report: wykres, heatmapa Tukeya i plik z wynikami testow i ANOVA w output_dir."""
+    from fpdf import FPDF
+
+    os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(output_dir, f"{report_name}.{output_format}")
+    chart_image_path = os.path.join(output_dir, f"{report_name}.png")
+    heatmap_path = os.path.join(output_dir, f"{report_name}_heatmap.png")
+
+    anova_stat, anova_p_value, tukey_matrix, heatmap_path = anova_and_tukey_heatmap(data_storage, heatmap_path)
+
+    figure.savefig(chart_image_path, bbox_inches="tight", dpi=150)
+    log.info("Wykres zapisany w: %s", chart_image_path)
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt="Statistical Test Report", ln=True, align='C')
+
+    # wyniki wszystkich testow statystycznych, nie tylko ANOVA
+    pdf.cell(200, 10, txt="Wyniki testów statystycznych:", ln=True)
+    pdf.ln(5)
+    for test, curves in results_storage.get_all_results().items():
+        pdf.cell(200, 10, txt=f"Test: {test}", ln=True)
+        for curve_id, metrics in curves.items():
+            pdf.cell(200, 10, txt=f"  Krzywa: {curve_id}", ln=True)
+            for metric, value in metrics.items():
+                pdf.cell(200, 10, txt=f"    {metric}: {value}", ln=True)
+        pdf.ln(5)
+
+    pdf.cell(200, 10, txt="ANOVA Results:", ln=True)
+    pdf.cell(200, 10, txt=f"  ANOVA F-statistic: {anova_stat:.4f}", ln=True)
+    pdf.cell(200, 10, txt=f"  ANOVA p-value: {anova_p_value:.4f}", ln=True)
+    pdf.ln(10)
+
+    # macierz Tukeya tylko jako osobna heatmapa
+    if pdf.get_y() + 100 > 270:
+        pdf.add_page()
+    pdf.image(chart_image_path, x=10, y=pdf.get_y() + 10, w=190)
+    pdf.ln(90)
+
+    pdf.output(report_path)
+    return report_path
+
+
+def load_strata(file_name):
+    """Lista warstw z pliku JSON albo YAML: kazda warstwa to slownik kolumna -> zakres jak w setRanges.
+
+    Zakres to tekst ('60-70', 'SVG,MVG'), liczba albo lista wartosci; pusta warstwa ({}) - bez filtrowania
+    (no preferences). Zwraca liste slownikow kolumna -> tekst zakresu.
+    """
+    with open(file_name, encoding='utf-8') as f:
+        if file_name.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading YAML strata requires PyYAML (pip install pyyaml).")
+            strata = yaml.safe_load(f)
+        else:
+            strata = json.load(f)
+    if not isinstance(strata, list) or not strata or not all(isinstance(stratum, dict) for stratum in strata):
+        raise ValueError(f"{file_name} must contain a non-empty list of strata (column: range mappings).")
+    return [{str(column): ','.join(map(str, value)) if isinstance(value, list) else str(value)
+             for column, value in stratum.items()} for stratum in strata]
+
+
+_worker_data = {}
+
+
+def _pool_curve_results(file_name, header_row, column_ranges, time_column, event_column, tests, population):
+    """curve_results warstwy w procesie puli; plik i tablice GUS wczytywane raz na proces (plik z ParsedFileCache)."""
+    key = (file_name, header_row)
+    if key not in _worker_data:
+        _worker_data.clear()
+        _worker_data[key] = open_dataset(file_name, header_row, ParsedFileCache())[0], LifeTableStore()
+    dataset, life_tables = _worker_data[key]
+    computed = curve_results(dataset, column_ranges, time_column, event_column, tests, life_tables,
+                             population_selection(column_ranges), population)
+    if computed is not None:
+        del computed['patients']  # wiersze warstwy zostaja w procesie puli
+    return computed
+
+
+def run_batch(file_name, strata, tests, header_row=1, time_column='time', event_column='event',
+              output_dir='plots', report_name='report', executor=None, progress=_no_progress,
+              at_risk_step=AT_RISK_STEP):
+    """Analiza listy warstw bez GUI - jak Execute dla pierwszej warstwy i Add next curve dla kolejnych.
+
+    strata - slowniki kolumna -> tekst zakresu (load_strata); krzywa GUS pierwszej warstwy jest odniesieniem
+    testow wszystkich warstw, tak jak w oknie. Z executor (parallel.process_pool) warstwy po pierwszej
+    licza sie rownolegle w procesach puli. Wyniki, wykres i raport trafiaja do output_dir/report_name;
+    liczby pacjentow w ryzyku na wykresie co at_risk_step lat.
+    Zwraca {'results': TestResultsStorage, 'messages': [(curve_id, opis)], 'skipped': warstwy bez pacjentow,
+    'not_drawn': warstwy bez miejsca na wykresie (brak wolnych kolorow), 'report': sciezka raportu}.
+    """
+    dataset, _ = open_dataset(file_name, header_row, ParsedFileCache(), progress)
+    for column in (time_column, event_column):
+        if column not in dataset.df.columns:
+            raise ValueError(f"Column '{column}' not found in {file_name}.")
+    all_ranges = []
+    for number, stratum in enumerate(strata, 1):
+        column_ranges = {}
+        for column, value_range in stratum.items():
+            if column not in dataset.df.columns:
+                raise ValueError(f"Stratum {number}: column '{column}' not found in {file_name}.")
+            try:
+                column_ranges[column] = parse_range(column, value_range, dataset.index)
+            except RangeError as e:
+                raise ValueError(f"Stratum {number}: {e}") from None
+        all_ranges.append(column_ranges)
+
+    life_tables = LifeTableStore()
+    results_storage = TestResultsStorage()
+    data_storage = DataResultsStorage()
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    messages, skipped, not_drawn = [], [], []
+
+    # pierwsza warstwa z pacjentami wyznacza krzywa GUS (Execute), jej testy korzystaja z calej puli
+    computed = []
+    rest = list(all_ranges)
+    while rest and not computed:
+        column_ranges = rest.pop(0)
+        result = curve_results(dataset, column_ranges, time_column, event_column, tests, life_tables,
+                               population_selection(column_ranges), progress=progress, executor=executor)
+        if result is None:
+            skipped.append(describe_ranges(column_ranges))
+        else:
+            computed.append((column_ranges, result))
+    if not computed:
+        raise ValueError("No data matching any of the strata.")
+    population = computed[0][1]['population']
+
+    # kolejne warstwy (Add next curve) - testy wzgledem krzywej GUS pierwszej warstwy
+    if executor is None:
+        results = []
+        for done, column_ranges in enumerate(rest):
+            progress(done, len(rest), 'strata')
+            results.append(curve_results(dataset, column_ranges, time_column, event_column, tests, life_tables,
+                                         population_selection(column_ranges), population))
+    else:
+        futures = [executor.submit(_pool_curve_results, file_name, header_row, column_ranges, time_column,
+                                   event_column, tests, population) for column_ranges in rest]
+        results = gather(futures, progress, 'strata')
+    for column_ranges, result in zip(rest, results):
+        if result is None:
+            skipped.append(describe_ranges(column_ranges))
+        else:
+            computed.append((column_ranges, result))
+
+    # wykres i wyniki w kolejnosci warstw - jak po Execute i kolejnych Add next curve
+    offset = 0
+    layout = at_risk_layout(at_risk_step)
+    for number, (column_ranges, result) in enumerate(computed):
+        curve_id = describe_ranges(column_ranges)
+        km = result['km']
+        if number == 0:
+            draw_first_curve(ax, km, 'PATIENT DATA', at_risk_step, layout)
+            draw_population_curve(ax, population)
+            set_time_range(ax, -0.5, km.times[-1] + 0.5)
+            data_storage.add_data("GUS", population[4])
+        elif curve_color(ax) is not None:
+            draw_next_curve(ax, km, f'ILL ({curve_id})', curve_color(ax), offset, at_risk_step, layout)
+            offset += NEXT_CURVE_OFFSET
+        else:
+            not_drawn.append(curve_id)  # brak wolnych kolorow - tylko wyniki
+        data_storage.add_data(curve_id, km.survival)
+        for test_name, test_result, message in result['tests']:
+            results_storage.add_result(test_name, curve_id, test_result)
+            messages.append((curve_id, message))
+    ax.legend()  # w oknie legenda jest osobnym widgetem
+
+    output_dir = os.path.join(output_dir, report_name)
+    report_path = write_report(output_dir, report_name, 'pdf', results_storage, data_storage, fig)
+    with open(os.path.join(output_dir, f"{report_name}_results.json"), 'w', encoding='utf-8') as f:
+        json.dump(results_storage.get_all_results(), f, indent=2, ensure_ascii=False, default=_json_value)
+    return {'results': results_storage, 'messages': messages, 'skipped': skipped, 'not_drawn': not_drawn,
+            'report': report_path}
+
+
+def _json_value(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
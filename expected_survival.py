@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from preprocessing_population_data import LifeTableStore, REFERENCE_YEAR
+
+# nazwy kolumn rozpoznawane tak samo jak w POMOKAstat.setRanges
+AGE_COLUMNS = ['age', 'wiek']
+MALE_COLUMNS = ['sex', 'plec', 'płeć', 'pŁeć', 'male', 'mezczyzna', 'mężczyzna']  # 1 = mezczyzna, 0 = kobieta
+FEMALE_COLUMNS = ['female', 'kobieta']  # 1 = kobieta, 0 = mezczyzna
+
+EDERER_I = 'ederer1'
+EDERER_II = 'ederer2'
+
+
+def patient_covariates(df):
+    """Zwraca wiek i plec pacjentow (kody tablic: 0 - mezczyzni, 1 - kobiety, 2 - ogolne) z kolumn DataFrame."""
+    columns = {str(column).strip().lower(): column for column in df.columns}
+
+    age_column = next((columns[name] for name in AGE_COLUMNS if name in columns), None)
+    if age_column is None:
+        raise ValueError("No age column found.")
+    ages = pd.to_numeric(df[age_column], errors='coerce').to_numpy(dtype=np.float64)
+
+    sexes = np.full(len(df), 2, dtype=np.int64)
+    male_column = next((columns[name] for name in MALE_COLUMNS if name in columns), None)
+    female_column = next((columns[name] for name in FEMALE_COLUMNS if name in columns), None)
+    if male_column is not None:
+        values = pd.to_numeric(df[male_column], errors='coerce').to_numpy()
+        sexes[values == 1] = 0
+        sexes[values == 0] = 1
+    elif female_column is not None:
+        values = pd.to_numeric(df[female_column], errors='coerce').to_numpy()
+        sexes[values == 1] = 1
+        sexes[values == 0] = 0
+
+    return ages, sexes
+
+
+def matched_curves(life_tables, ages, sexes, index_years):
+    """Krzywa przezycia (0-1) z tablicy GUS dla kazdego pacjenta: wiersz = rocznik (wydanie - wiek)."""
+    ages = np.asarray(ages, dtype=np.float64)
+    sexes = np.asarray(sexes, dtype=np.int64)
+
+    if isinstance(life_tables, LifeTableStore):
+        if index_years is None:
+            releases = np.full(len(ages), REFERENCE_YEAR, dtype=np.int64)
+        else:
+            index_years = np.asarray(index_years, dtype=np.float64)
+            releases = np.full(len(ages), REFERENCE_YEAR, dtype=np.int64)
+            known = ~np.isnan(index_years)
+            releases[known] = life_tables.releases_for(index_years[known].astype(np.int64))
+        tables = {release: life_tables.table(release) for release in np.unique(releases)}
+    else:
+        releases = np.full(len(ages), life_tables.reference_year, dtype=np.int64)
+        tables = {life_tables.reference_year: life_tables}
+
+    valid = ~np.isnan(ages)
+    birth_years = np.where(valid, releases - np.nan_to_num(ages).astype(np.int64), 0)
+
+    parts = []
+    for release, table in tables.items():
+        rows = np.flatnonzero(releases == release)
+        parts.append((rows, table.cohort_curves(sexes[rows], birth_years[rows])))
+
+    curves = np.full((len(ages), max(part.shape[1] for _, part in parts)), np.nan)
+    for rows, part in parts:
+        curves[rows, :part.shape[1]] = part
+    curves[~valid] = np.nan
+    return curves / 100
+
+
+def expected_survival(life_tables, ages, sexes, index_years=None, times=None, method=EDERER_I):
+    """Oczekiwane przezycie kohorty dopasowane do wieku i plci kazdego pacjenta.
+
+    life_tables - LifeTableStore (wydanie wg roku operacji z index_years) albo pojedyncza LifeTable.
+    method - EDERER_I albo EDERER_II (zob. cohort_expected).
+    Zwraca (x, y): punkty czasu [lata] i oczekiwane prawdopodobienstwo przezycia.
+    """
+    return cohort_expected(matched_curves(life_tables, ages, sexes, index_years), times, method)
+
+
+def _zero_past_end(curves):
+    """Krzywe z zerami po ostatniej znanej wartosci kazdego wiersza; wiersze bez wartosci zostaja NaN."""
+    known = ~np.isnan(curves)
+    matched = known.any(axis=1)
+    last = curves.shape[1] - 1 - np.argmax(known[:, ::-1], axis=1)
+    past = (np.arange(curves.shape[1])[None, :] > last[:, None]) & matched[:, None]
+    return np.where(past, 0.0, curves)
+
+
+def cohort_expected(curves, times=None, method=EDERER_I):
+    """Oczekiwane przezycie kohorty z krzywych pacjentow (matched_curves).
+
+    method:
+      'ederer1' - srednia krzywych wszystkich pacjentow (Ederer I),
+      'ederer2' - w kazdym przedziale srednie warunkowe przezycie pacjentow wciaz obserwowanych
+                  (czas obserwacji times >= poczatek przedzialu), mnozone kumulatywnie (Ederer II).
+    Krzywa pacjenta konczy sie wczesniej, gdy jego wiek wychodzi poza tablice GUS (najstarsze roczniki) -
+    dalej przyjmowane jest przezycie 0, a nie brak danych: inaczej najstarsi wypadaliby ze sredniej
+    w pozniejszych punktach i oczekiwane przezycie dlugiej obserwacji byloby zawyzone.
+    Pacjenci bez zadnej wartosci (brak wieku, rocznik spoza tablic) sa pomijani.
+    Zwraca (x, y): punkty czasu [lata] i oczekiwane prawdopodobienstwo przezycia.
+    """
+    curves = _zero_past_end(np.asarray(curves, dtype=np.float64))
+    known = ~np.isnan(curves)
+    if not known.any():
+        raise ValueError("No patients matching the population tables.")
+    x = np.arange(curves.shape[1])
+
+    if method == EDERER_I:
+        counts = known.sum(axis=0)
+        y = np.full(curves.shape[1], np.nan)
+        np.divide(np.where(known, curves, 0.0).sum(axis=0), counts, out=y, where=counts > 0)
+        return x, y
+
+    if method == EDERER_II:
+        if times is None:
+            raise ValueError("Ederer II requires follow-up times.")
+        times = np.asarray(times, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            conditional = curves[:, 1:] / curves[:, :-1]
+        # pacjenci w obserwacji na poczatku kazdego przedzialu
+        weights = (times[:, None] >= x[None, :-1]) & ~np.isnan(conditional)
+        counts = weights.sum(axis=0)
+        interval = np.full(len(counts), np.nan)
+        np.divide(np.where(weights, conditional, 0.0).sum(axis=0), counts, out=interval, where=counts > 0)
+        y = np.concatenate(([1.0], np.cumprod(interval)))
+        return x, y
+
+    raise ValueError(f"Unknown expected survival method: {method}.")
@@ -0,0 +1,389 @@
+import hashlib
+import io
+import os
+import tempfile
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import feather, fs
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+# formaty kolumnowe: nazwy kolumn w schemacie pliku, czytane tylko potrzebne kolumny i wiersze
+COLUMNAR_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.feather': 'ipc', '.arrow': 'ipc', '.ipc': 'ipc'}
+COLUMNAR_EXTENSIONS = tuple(COLUMNAR_FORMATS)
+
+# CSV od tej wielkosci nie jest wczytywany w calosci - krzywe czytaja go kawalkami (CsvStream)
+STREAM_MIN_BYTES = 1 << 30
+STREAM_CHUNK_ROWS = 500_000
+
+# co ile bajtow CSV / wierszy arkusza raportowany jest postep wczytywania
+PROGRESS_BYTES = 16 << 20
+PROGRESS_ROWS = 10_000
+
+# sparsowane pliki pacjentow (Feather) - ponowne wczytanie tego samego pliku bez parsowania
+FILE_CACHE_DIR = os.path.join('data', 'cache', 'files')
+FILE_CACHE_MAX_BYTES = 2 << 30
+
+# kolumny tekstowe o co najwyzej tylu unikalnych wartosciach (i o malym udziale unikalnych) -> category
+MAX_CATEGORIES = 1000
+MAX_CATEGORY_RATIO = 0.5
+
+
+def optimize_dtypes(df, max_categories=MAX_CATEGORIES, max_category_ratio=MAX_CATEGORY_RATIO):
+    """Zmniejsza typy kolumn wczytanego pliku bez zmiany wartosci.
+
+    - liczby calkowite -> najmniejszy typ (int8/int16/...; np. event, sex, age),
+    - liczby zmiennoprzecinkowe -> float32 tylko gdy konwersja jest dokladna (czasy w latach/miesiacach
+      z rozwinieciem dziesietnym zostaja float64, zeby nie przesuwac osi czasu KM i wynikow testow),
+    - teksty o malej liczbie unikalnych wartosci (np. SVG/MVG/ART) -> category.
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            columns[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy()
+            downcast = values.astype(np.float32)
+            if np.array_equal(downcast.astype(values.dtype), values, equal_nan=True):
+                columns[column] = pd.Series(downcast, index=series.index, name=column)
+        elif series.dtype == object:
+            n_unique = series.nunique(dropna=True)
+            if n_unique <= max_categories and n_unique <= max_category_ratio * len(series):
+                columns[column] = series.astype('category')
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for column, values in columns.items():
+        df[column] = values
+    return df
+
+
+def _cell_value(value):
+    # konwersja jak w czytniku openpyxl z pandas: puste -> "", bledy -> NaN, liczby calkowite -> int
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value in ERROR_CODES:
+        return np.nan
+    return value
+
+
+def _no_progress(done, total=0, unit=''):
+    pass
+
+
+def _xlsx_rows(file_name, progress=_no_progress):
+    """Surowe wiersze pierwszego arkusza xlsx w postaci, jaka TextParser dostaje w pd.read_excel.
+
+    Jedno przejscie openpyxl z values_only - bez tworzenia obiektow komorek, wyraznie szybciej.
+    """
+    workbook = openpyxl.load_workbook(file_name, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = sheet.max_row or 0  # z wymiarow zapisanych w pliku - tylko do paska postepu
+        sheet.reset_dimensions()
+        rows = []
+        last_row_with_data = -1
+        for number, values in enumerate(sheet.iter_rows(values_only=True)):
+            if number % PROGRESS_ROWS == 0:
+                progress(number, total_rows, 'rows')
+            row = [_cell_value(value) for value in values]
+            while row and row[-1] == "":
+                row.pop()
+            if row:
+                last_row_with_data = number
+            rows.append(row)
+    finally:
+        workbook.close()
+
+    rows = rows[:last_row_with_data + 1]
+    if rows:
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+    return rows
+
+
+class ParsedFileCache:
+    """Cache sparsowanych plikow na dysku: jeden plik Feather (Arrow IPC bez kompresji) na zbior.
+
+    Klucz to bezwzgledna sciezka, rozmiar, mtime i wiersz naglowka - zmiana pliku zrodlowego
+    daje nowy klucz. Odczyt przez mapowanie pliku w pamieci, bez parsowania. Laczny rozmiar
+    ograniczony do max_bytes; usuwane sa najdawniej uzywane wpisy (mtime wpisu = ostatnie uzycie).
+    """
+
+    def __init__(self, cache_dir=FILE_CACHE_DIR, max_bytes=FILE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, file_name, header_row):
+        stat = os.stat(file_name)
+        key = f"{os.path.abspath(file_name)}|{stat.st_size}|{stat.st_mtime_ns}|{header_row}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.feather')
+
+    def load(self, file_name, header_row):
+        """DataFrame z cache albo None, gdy pliku nie ma w cache."""
+        try:
+            path = self._path(file_name, header_row)
+            df = feather.read_table(path, memory_map=True).to_pandas()
+            os.utime(path)
+            return df
+        except (OSError, pa.ArrowException):
+            return None
+
+    def store(self, file_name, header_row, df):
+        """Zapisuje DataFrame; kolumny, ktorych Arrow nie zapisze (np. mieszane typy), pomijaja cache."""
+        tmp_path = None
+        try:
+            path = self._path(file_name, header_row)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # wlasny plik tymczasowy kazdego zapisu - rownolegle zapisy (kilka okien, cli) sie nie mieszaja
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            os.close(fd)
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+            tmp_path = None
+            self._evict()
+        except (OSError, ValueError, TypeError, pa.ArrowException):
+            # katalog tylko do odczytu albo dane nie do zapisania w Arrow - wczytanie dziala bez cache
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.feather'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # usuniety w miedzyczasie przez inny proces
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries[:-1]:  # najnowszy wpis zostaje, nawet gdy sam przekracza limit
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class SourceFile:
+    """Plik z danymi pacjentow parsowany raz - do weryfikacji wiersza naglowka i do wczytania danych.
+
+    CSV trzymany jest w pamieci jako bajty (ponowne parsowanie kilku wierszy jest tanie), arkusz
+    Excela jako surowe wiersze z jednego przejscia przez openpyxl (xlsx) albo xlrd (xls).
+    Duzy CSV (streamed) nie jest wczytywany - dane daje CsvStream, pliki Parquet/Feather/Arrow
+    (columnar) - ColumnarFile. DataFrame z wybranym
+    naglowkiem powstaje z tych wierszy tym samym parserem co w pd.read_excel, wiec nazwy kolumn
+    (Unnamed: n, duplikaty .1) i typy sa identyczne jak przy bezposrednim wczytaniu.
+    Z cache (ParsedFileCache) plik, ktory byl juz wczytany, nie jest w ogole parsowany.
+    progress(done, total, unit) jest wywolywane w trakcie czytania CSV (bajty) i arkusza xlsx (wiersze);
+    wyjatek zgloszony z progress przerywa wczytywanie.
+    """
+
+    def __init__(self, file_name, cache=None, progress=_no_progress):
+        self.file_name = file_name
+        self.cache = cache
+        self.progress = progress
+        self._content = None
+        self._cached = {}
+        self.streamed = file_name.endswith('.csv') and os.path.getsize(file_name) >= STREAM_MIN_BYTES
+        self.columnar = file_name.lower().endswith(COLUMNAR_EXTENSIONS)
+
+    def _load(self):
+        if self._content is None:
+            if self.file_name.endswith('.csv'):
+                self._content = self._read_bytes()
+            elif self.file_name.endswith('.xlsx'):
+                self._content = _xlsx_rows(self.file_name, self.progress)
+            elif self.file_name.endswith(EXCEL_EXTENSIONS):
+                raw = pd.read_excel(self.file_name, header=None, dtype=object)
+                # puste komorki jako "" - tak jak podaje je czytnik arkuszy pandas
+                self._content = raw.where(raw.notna(), "").values.tolist()
+            else:
+                raise ValueError("Unsupported file format")
+        return self._content
+
+    def _read_bytes(self):
+        total = os.path.getsize(self.file_name)
+        content = bytearray(total)
+        view = memoryview(content)
+        done = 0
+        with open(self.file_name, 'rb') as f:
+            while done < total:
+                self.progress(done, total, 'bytes')
+                read = f.readinto(view[done:done + PROGRESS_BYTES])
+                if not read:
+                    break
+                done += read
+        view.release()
+        del content[done:]
+        return content
+
+    def preview(self, header_row, nrows=10):
+        """Pierwsze wiersze danych przy naglowku w wierszu header_row (numeracja od 1)."""
+        if self.columnar:
+            return ColumnarFile(self.file_name).head(nrows)  # naglowek w schemacie - header_row bez znaczenia
+        if self.streamed:
+            return pd.read_csv(self.file_name, header=header_row - 1, nrows=nrows)
+        cached = self._from_cache(header_row)
+        if cached is not None:
+            return cached.head(nrows)
+        content = self._load()
+        if isinstance(content, bytearray):
+            return pd.read_csv(io.BytesIO(content), header=header_row - 1, nrows=nrows)
+        rows = [list(row) for row in content[:header_row + nrows]]
+        return TextParser(rows, header=header_row - 1, skip_blank_lines=False).read(nrows=nrows)
+
+    def _from_cache(self, header_row):
+        if self.cache is None:
+            return None
+        if header_row not in self._cached:
+            self._cached[header_row] = self.cache.load(self.file_name, header_row)
+        return self._cached[header_row]
+
+    def frame(self, header_row):
+        """Caly zbior przy naglowku w wierszu header_row, w zmniejszonych typach (optimize_dtypes).
+
+        Surowa zawartosc jest potem zwalniana; wynik trafia do cache.
+        """
+        cached = self._from_cache(header_row)
+        if cached is not None:
+            self._cached.clear()
+            return cached
+        content = self._load()
+        self._content = None
+        if isinstance(content, bytearray):
+            df = pd.read_csv(io.BytesIO(content), header=header_row - 1)
+        else:
+            df = TextParser(content, header=header_row - 1, skip_blank_lines=False).read()
+        df = optimize_dtypes(df)
+        if self.cache is not None:
+            self.cache.store(self.file_name, header_row, df)
+        return df
+
+
+def range_mask(df, column_ranges):
+    """Maska wierszy spelniajacych zakresy {kolumna: ('numeric'|'categorical', wartosci)} z setRanges."""
+    mask = np.ones(len(df), dtype=bool)
+    for column, (range_type, values) in column_ranges.items():
+        if range_type == 'numeric':
+            lower, upper = values
+            mask &= ((df[column] >= lower) & (df[column] <= upper)).to_numpy()
+        elif range_type == 'categorical':
+            mask &= df[column].isin(values).to_numpy()
+    return mask
+
+
+class CsvStream:
+    """CSV wiekszy niz pamiec: w pamieci tylko naglowek, dane czytane kawalkami przy kazdym zapytaniu.
+
+    Kazde zapytanie czyta wylacznie potrzebne kolumny (usecols), filtruje kazdy kawalek zakresami
+    i zostawia tylko pasujace wiersze w zmniejszonych typach. Indeks wyniku to numery wierszy pliku.
+    Udostepnia unique_values/rows jak StratificationIndex, wiec setRanges dziala bez zmian.
+    """
+
+    def __init__(self, file_name, header_row, chunk_rows=STREAM_CHUNK_ROWS):
+        self.file_name = file_name
+        self.header_row = header_row
+        self.chunk_rows = chunk_rows
+        self.header = pd.read_csv(file_name, header=header_row - 1, nrows=0)
+        self._uniques = {}
+
+    def _chunks(self, columns):
+        # kolejne kawalki maja ciagly RangeIndex - numery wierszy w pliku
+        return pd.read_csv(self.file_name, header=self.header_row - 1, usecols=list(columns),
+                           chunksize=self.chunk_rows)
+
+    def select(self, column_ranges, columns):
+        """Wiersze spelniajace zakresy, tylko z kolumnami columns (i kolumnami zakresow)."""
+        columns = list(dict.fromkeys(list(columns) + list(column_ranges)))
+        parts = [chunk[range_mask(chunk, column_ranges)] for chunk in self._chunks(columns)]
+        df = pd.concat(parts) if parts else self.header[columns]
+        return optimize_dtypes(df)
+
+    def rows(self, column_ranges):
+        return self.select(column_ranges, []).index.to_numpy()
+
+    def unique_values(self, column):
+        if column not in self._uniques:
+            parts = [pd.Series(pd.unique(chunk[column])) for chunk in self._chunks([column])]
+            self._uniques[column] = pd.unique(pd.concat(parts)).tolist() if parts else []
+        return self._uniques[column]
+
+
+class ColumnarFile:
+    """Plik Parquet/Feather/Arrow IPC czytany przez pyarrow.dataset - w pamieci tylko schemat.
+
+    Kazde zapytanie czyta wylacznie potrzebne kolumny (projekcja), a zakresy z setRanges przekazuje
+    do skanera jako filtr (Parquet pomija grupy wierszy po statystykach min/max). Pliki Arrow/Feather
+    sa mapowane w pamieci, wiec bez kompresji nie sa kopiowane przy czytaniu.
+    Zakresy, ktorych nie da sie porownac w Arrow tak jak w pandas (liczby na kolumnie tekstowej,
+    teksty na kolumnie liczbowej, kolumny logiczne), sa sprawdzane na wczytanym kawalku przez range_mask.
+    Udostepnia header/select/rows/unique_values jak CsvStream. Indeks wyniku select - kolejne numery.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        extension = os.path.splitext(file_name)[1].lower()
+        self.dataset = ds.dataset(os.path.abspath(file_name), format=COLUMNAR_FORMATS[extension],
+                                  filesystem=fs.LocalFileSystem(use_mmap=True))
+        self.header = self.dataset.schema.empty_table().to_pandas()
+        self.n_rows = self.dataset.count_rows()
+        self._uniques = {}
+
+    def head(self, nrows=10):
+        return self.dataset.head(nrows).to_pandas()
+
+    def _pushdown(self, column_ranges):
+        """Dzieli zakresy na filtr Arrow i zakresy sprawdzane w pandas (semantyka jak range_mask)."""
+        expression = None
+        remaining = {}
+        for column, (range_type, values) in column_ranges.items():
+            field_type = self.dataset.schema.field(column).type
+            if range_type == 'numeric' and (pa.types.is_integer(field_type) or pa.types.is_floating(field_type)):
+                lower, upper = values
+                condition = (pc.field(column) >= lower) & (pc.field(column) <= upper)
+            elif range_type == 'categorical' and (pa.types.is_string(field_type) or
+                                                  pa.types.is_large_string(field_type)):
+                condition = pc.field(column).isin(list(values))
+            else:
+                remaining[column] = (range_type, values)
+                continue
+            expression = condition if expression is None else expression & condition
+        return expression, remaining
+
+    def select(self, column_ranges, columns):
+        """Wiersze spelniajace zakresy, tylko z kolumnami columns (i kolumnami zakresow)."""
+        columns = list(dict.fromkeys(list(columns) + list(column_ranges)))
+        expression, remaining = self._pushdown(column_ranges)
+        df = self.dataset.to_table(columns=columns, filter=expression).to_pandas()
+        if remaining:
+            df = df[range_mask(df, remaining)].reset_index(drop=True)
+        return optimize_dtypes(df)
+
+    def rows(self, column_ranges):
+        """Numery wierszy pliku spelniajacych zakresy (czytane tylko kolumny zakresow)."""
+        df = self.dataset.to_table(columns=list(column_ranges)).to_pandas()
+        return np.flatnonzero(range_mask(df, column_ranges))
+
+    def unique_values(self, column):
+        if column not in self._uniques:
+            values = self.dataset.to_table(columns=[column]).column(column).to_pandas()
+            self._uniques[column] = values.unique().tolist()
+        return self._uniques[column]
@@ -0,0 +1,194 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+class KaplanMeierFit:
+    """Wynik estymatora Kaplana-Meiera jako zwykle tablice (os czasu jak w lifelines: unikalne czasy + 0).
+
+    times     - punkty osi czasu,
+    survival  - przezycie KM,
+    at_risk   - liczba pacjentow w ryzyku w danym punkcie,
+    deaths    - liczba zdarzen, censored - liczba obserwacji cenzurowanych,
+    variance  - suma Greenwooda (wariancja log przezycia).
+    """
+
+    def __init__(self, times, survival, at_risk, deaths, censored, variance):
+        self.times = times
+        self.survival = survival
+        self.at_risk = at_risk
+        self.deaths = deaths
+        self.censored = censored
+        self.variance = variance
+
+    def confidence_interval(self, alpha=0.05):
+        """Przedzial ufnosci z wykladniczego wzoru Greenwooda (log(-log)), jak w lifelines."""
+        z = NormalDist().inv_cdf(1 - alpha / 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            v = np.log(self.survival)
+            lower = np.exp(-np.exp(np.log(-v) - z * np.sqrt(self.variance) / v))
+            upper = np.exp(-np.exp(np.log(-v) + z * np.sqrt(self.variance) / v))
+        return np.nan_to_num(lower, nan=1.0), np.nan_to_num(upper, nan=1.0)
+
+    def survival_at(self, times):
+        """Przezycie (funkcja schodkowa) w podanych chwilach."""
+        idx = np.searchsorted(self.times, times, side='right') - 1
+        return np.where(idx >= 0, self.survival[np.clip(idx, 0, None)], 1.0)
+
+    def nearest_indices(self, ticks):
+        """Indeksy punktow osi czasu najblizszych chwilom ticks (przy remisie - wczesniejszy).
+
+        Jedno searchsorted dla wszystkich chwil: kandydatami sa tylko sasiedzi z lewej i z prawej.
+        """
+        ticks = np.asarray(ticks, dtype=np.float64)
+        if len(self.times) == 1:
+            return np.zeros(len(ticks), dtype=np.int64)
+        right = np.clip(np.searchsorted(self.times, ticks), 1, len(self.times) - 1)
+        left = right - 1
+        return np.where(ticks - self.times[left] <= self.times[right] - ticks, left, right)
+
+
+def _segmented_cumsum(values, starts):
+    """Skumulowana suma liczona od nowa w kazdym segmencie (starts - indeksy poczatkow segmentow)."""
+    values = values.copy()
+    totals = np.add.reduceat(values, starts)
+    # na poczatku segmentu odejmujemy sume poprzedniego, wiec suma biezaca wraca do zera
+    values[starts[1:]] -= totals[:-1]
+    return np.cumsum(values)
+
+
+def _fit_segments(durations, events, sizes):
+    """KM dla kolejnych segmentow danych posortowanych wg czasu wewnatrz segmentu - bez petli po grupach."""
+    n_groups = len(sizes)
+    segment = np.repeat(np.arange(n_groups), sizes)
+
+    # granice unikalnych par (segment, czas)
+    new = np.ones(len(durations), dtype=bool)
+    new[1:] = (durations[1:] != durations[:-1]) | (segment[1:] != segment[:-1])
+    first = np.flatnonzero(new)
+    times = durations[first]
+    owner = segment[first]
+    removed = np.diff(np.append(first, len(durations)))
+    deaths = np.add.reduceat(events, first) if len(first) else np.zeros(0, dtype=np.int64)
+
+    # os czasu kazdej grupy zaczyna sie od 0 (pacjenci wchodza do obserwacji w chwili 0)
+    group_start = np.searchsorted(owner, np.arange(n_groups))
+    empty = group_start >= len(times)
+    needs_zero = empty | (times[np.minimum(group_start, len(times) - 1)] > 0) if len(times) else empty
+    at = group_start[needs_zero]
+    times = np.insert(times, at, 0.0)
+    owner = np.insert(owner, at, np.flatnonzero(needs_zero))
+    removed = np.insert(removed, at, 0)
+    deaths = np.insert(deaths, at, 0)
+    group_start = np.searchsorted(owner, np.arange(n_groups))
+    group_end = np.append(group_start[1:], len(times))
+
+    removed_before = np.cumsum(removed) - removed
+    at_risk = np.asarray(sizes)[owner] - (removed_before - removed_before[group_start][owner])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_terms = np.log(at_risk - deaths) - np.log(at_risk)
+        terms = deaths / (at_risk.astype(np.float64) * (at_risk - deaths))
+    terms[np.isinf(terms)] = 0
+
+    # zgon wszystkich pozostalych (log 0) zeruje przezycie do konca grupy
+    extinct = np.isinf(log_terms)
+    log_terms[extinct] = 0
+    survival = np.exp(_segmented_cumsum(log_terms, group_start))
+    survival[_segmented_cumsum(extinct.astype(np.int64), group_start) > 0] = 0
+    variance = np.maximum(_segmented_cumsum(terms, group_start), 0)
+    # przed pierwszym zgonem w grupie dokladnie 1 i 0 (sumy zmiennoprzecinkowe po resecie moga zostawic ~1e-16)
+    no_deaths_yet = _segmented_cumsum(deaths, group_start) == 0
+    survival[no_deaths_yet] = 1.0
+    variance[no_deaths_yet] = 0.0
+
+    return [KaplanMeierFit(times[a:b], survival[a:b], at_risk[a:b], deaths[a:b], removed[a:b] - deaths[a:b],
+                           variance[a:b])
+            for a, b in zip(group_start, group_end)]
+
+
+def _as_events(event_observed, n):
+    if event_observed is None:
+        return np.ones(n, dtype=np.int64)
+    return np.asarray(event_observed).astype(bool).astype(np.int64)
+
+
+def _missing(durations, event_observed):
+    """Maska wierszy bez czasu obserwacji albo bez zdarzenia (NaN, tez nieskonczony czas)."""
+    missing = ~np.isfinite(durations)
+    if event_observed is not None:
+        missing |= pd.isna(np.asarray(event_observed))
+    return missing
+
+
+def _check_missing(missing):
+    # lifelines odrzucal takie dane; tutaj NaN dalby bledny punkt osi czasu i liczbe pacjentow w ryzyku
+    if missing.any():
+        raise ValueError(f"Missing or non-finite time/event values for {int(missing.sum())} patients. "
+                         "Remove or fill these rows before the analysis.")
+
+
+def kaplan_meier(durations, event_observed=None):
+    """Estymator Kaplana-Meiera: jedno sortowanie, zliczenia na granicach czasow, przezycie przez skumulowana sume logarytmow."""
+    durations = np.asarray(durations, dtype=np.float64)
+    _check_missing(_missing(durations, event_observed))
+    events = _as_events(event_observed, len(durations))
+    order = np.argsort(durations, kind='stable')
+    return _fit_segments(durations[order], events[order], [len(durations)])[0]
+
+
+class GroupedKaplanMeier:
+    """KM dla wielu podgrup jednego zbioru: dane sortowane wg czasu raz, przy tworzeniu.
+
+    fit(mask)          - jedna podgrupa (np. kolejna krzywa z "Add next curve"),
+    fit_rows(rows)     - jedna podgrupa podana numerami wierszy (np. ze StratificationIndex),
+    fit_groups(labels) - wszystkie podgrupy naraz, segmentowe sumy skumulowane zamiast petli po grupach.
+    Maski, numery wierszy i etykiety odnosza sie do kolejnosci wierszy danych wejsciowych.
+    """
+
+    def __init__(self, durations, event_observed=None):
+        durations = np.asarray(durations, dtype=np.float64)
+        self.order = np.argsort(durations, kind='stable')
+        self.durations = durations[self.order]
+        self.events = _as_events(event_observed, len(durations))[self.order]
+        # braki sprawdzane dopiero w wybranych wierszach - nie musza przeszkadzac innym podgrupom
+        self.missing = _missing(durations, event_observed)[self.order]
+        self.rank = None
+
+    def fit(self, mask):
+        mask = np.asarray(mask, dtype=bool)[self.order]
+        _check_missing(self.missing[mask])
+        return _fit_segments(self.durations[mask], self.events[mask], [int(mask.sum())])[0]
+
+    def fit_rows(self, rows):
+        """Jedna podgrupa podana numerami wierszy - koszt zalezy od wielkosci podgrupy, nie calego zbioru."""
+        if self.rank is None:
+            self.rank = np.empty_like(self.order)
+            self.rank[self.order] = np.arange(len(self.order))
+        positions = np.sort(self.rank[np.asarray(rows, dtype=np.int64)])
+        _check_missing(self.missing[positions])
+        return _fit_segments(self.durations[positions], self.events[positions], [len(positions)])[0]
+
+    def fit_groups(self, labels):
+        """Zwraca slownik {etykieta: KaplanMeierFit}; wiersze z etykieta None/NaN sa pomijane."""
+        if not isinstance(labels, (np.ndarray, pd.Series)):
+            labels = pd.Series(list(labels))  # lista krotek nie moze stac sie tablica 2D
+        codes, uniques = pd.factorize(np.asarray(labels)[self.order])
+        # stabilne sortowanie kodow zachowuje kolejnosc czasow wewnatrz grupy
+        by_group = np.argsort(codes, kind='stable')
+        by_group = by_group[codes[by_group] >= 0]
+        _check_missing(self.missing[by_group])
+        sizes = np.bincount(codes[by_group], minlength=len(uniques))
+        fits = _fit_segments(self.durations[by_group], self.events[by_group], sizes)
+        return dict(zip(uniques, fits))
+
+
+def plot_kaplan_meier(ax, fit, label, color=None, ci_alpha=0.25):
+    """Rysuje krzywa KM z przedzialem ufnosci (wyglad jak plot_survival_function z lifelines)."""
+    line, = ax.plot(fit.times, fit.survival, drawstyle='steps-post', color=color, label=label)
+    color = line.get_color()  # bez color - kolejny kolor z cyklu osi
+    lower, upper = fit.confidence_interval()
+    ax.fill_between(fit.times, lower, upper, alpha=ci_alpha, color=color, linewidth=1.0, step='post')
+    ax.legend()
+    return ax
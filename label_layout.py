@@ -0,0 +1,48 @@
+import math
+
+
+class LabelLayout:
+    """Rozmieszczenie napisow na wykresie bez nakladania (liczby pacjentow w ryzyku wszystkich krzywych).
+
+    Dwa napisy koliduja, gdy |dx| < width i |dy| < height (jednostki osi). Napisy sa w indeksie zajetosci
+    na siatce komorek width x height, wiec kolidowac z punktem moga tylko napisy z 3 x 3 sasiednich
+    komorek - sprawdzenie miejsca nie zalezy od liczby napisow na wykresie. Jeden obiekt na wykres:
+    napisy kolejnej krzywej omijaja napisy wszystkich poprzednich.
+    """
+
+    def __init__(self, width=0.5, height=0.05, step=0.01):
+        self.width = width
+        self.height = height
+        self.step = step
+        self._cells = {}
+
+    def _cell(self, x, y):
+        return math.floor(x / self.width), math.floor(y / self.height)
+
+    def _collision(self, x, y):
+        """y napisu kolidujacego z punktem (x, y) albo None."""
+        cx, cy = self._cell(x, y)
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                for other_x, other_y in self._cells.get((i, j), ()):
+                    if abs(x - other_x) < self.width and abs(y - other_y) < self.height:
+                        return other_y
+        return None
+
+    def free_y(self, x, y):
+        """Najnizsze y + k * step (k >= 0) bez kolizji z dodanymi napisami.
+
+        Wynik jak przy przesuwaniu napisu w gore o step az do wolnego miejsca, ale od razu ponad kolidujacy
+        napis - liczba krokow zalezy od liczby napisow w kolumnie, a nie od odleglosci.
+        """
+        k = 0
+        while True:
+            candidate = y + k * self.step
+            other_y = self._collision(x, candidate)
+            if other_y is None:
+                return candidate
+            # wszystkie punkty ponizej other_y + height koliduja z tym samym napisem
+            k = max(k + 1, math.ceil((other_y + self.height - y) / self.step - 1e-9))
+
+    def add(self, x, y):
+        self._cells.setdefault(self._cell(x, y), []).append((x, y))
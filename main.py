@@ -1,66 +1,33 @@
 import os
 import sys
+import threading
 from datetime import datetime
 
 # PySide6 imports
-from PySide6.QtWidgets import (QHeaderView, QWidget, QComboBox, QListView, QRadioButton, QMessageBox, QHBoxLayout, QScrollArea, QFileDialog, QAbstractItemView, QListWidget, QInputDialog, QTableWidget, QTableWidgetItem, QSizePolicy)
+from PySide6.QtWidgets import (QHeaderView, QWidget, QComboBox, QListView, QRadioButton, QMessageBox, QHBoxLayout, QScrollArea, QFileDialog, QAbstractItemView, QListWidget, QInputDialog, QTableWidget, QTableWidgetItem, QSizePolicy, QProgressBar)
 from PySide6.QtGui import QIcon, QGuiApplication
 from PySide6.QtCore import Qt
 
-# Data handling and analysis
-import pandas as pd
-import numpy as np
-import re
-from scipy import stats
-from scipy.interpolate import interp1d
-from scipy.stats import mannwhitneyu
-
 # Matplotlib for plotting
 import matplotlib
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.patheffects import withStroke
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-
-# Lifelines for survival analysis
-from lifelines import KaplanMeierFitter
-from scipy.stats import ks_2samp
-
-import seaborn as sns
+from matplotlib.figure import Figure
 
 # Custom imports
-from preprocessing_population_data import prepare_data, save_data_to_excel, lineChartOne, lineChartRange
-
-from fpdf import FPDF
-from PIL import Image
+from preprocessing_population_data import LifeTableStore
+from ingestion import ParsedFileCache, SourceFile, COLUMNAR_EXTENSIONS
+from survival_tests import TEST_NAMES
+from parallel import process_pool
+from engine import (TestResultsStorage, DataResultsStorage, RangeError, valid_headers, load_dataset, parse_range,
+                    population_selection, describe_ranges, curve_results,
+                    curve_color, draw_first_curve, draw_population_curve, draw_next_curve, write_report,
+                    set_time_range, tick_label, warm_up, at_risk_layout, draw_first_at_risk, draw_next_at_risk,
+                    AT_RISK_STEP, AT_RISK_MIN_STEP, NEXT_CURVE_OFFSET)
+from canvas_redraw import CanvasRedraw
+from workers import Task
 
 os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
 
-class TestResultsStorage:
-    def __init__(self):
-        self.results = {}  # Struktura: {"Test_Name": {"Curve_ID": {"Metric": value}}}
-
-    def add_result(self, test_name, curve_id, result_dict):
-        if test_name not in self.results:
-            self.results[test_name] = {}
-        self.results[test_name][curve_id] = result_dict
-
-    def get_result(self, test_name, curve_id):
-        return self.results.get(test_name, {}).get(curve_id, None)
-
-    def get_all_results(self):
-        return self.results
-
-class DataResultsStorage:
-    def __init__(self):
-        self.results = {}
-
-    def add_data(self, curve_id, data):
-        self.results[curve_id] = data
-
-    def get_all_data(self):
-        return self.results
-
 
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QCheckBox, QPushButton, QLabel
 
@@ -394,7 +361,10 @@ class ChartEditorDialog(QWidget):
         self.original_colors = []  # Przechowuje oryginalne kolory linii
         self.original_styles = []  # Przechowuje oryginalne style linii
         self.pomoka_stat = pomoka_stat  # Przechowaj instancję POMOKAstat
+        # zmiany z edytora rysowane raz, po obsłudze kliknięcia (zob. CanvasRedraw)
+        self.redraw = CanvasRedraw(figure)
         self.text_visible = True
+        self.x_range = None  # zakres z Apply X-axis Range - liczby pacjentów poza nim są ukryte
         self.initUI()
         self.tick_step = 2
 
@@ -684,15 +654,13 @@ class ChartEditorDialog(QWidget):
             for text in ax.texts:
                 text.set_visible(self.text_visible)
 
-        self.figure.canvas.draw_idle()
-
-        # Zaktualizuj wykres w POMOKAstat
-        self.pomoka_stat.canvas.draw()
+        # tylko napisy - na zapamietanym tle wykresu, bez pelnego rysowania
+        self.redraw.texts()
     def toggleTitle(self):
         """Włącz lub wyłącz tytuł wykresu."""
         for ax in self.figure.axes:
             ax.set_title('' if ax.get_title() else self.title_input.text())
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def applyFontSize(self):
         """Zastosuj rozmiar czcionki do osi."""
@@ -702,7 +670,7 @@ class ChartEditorDialog(QWidget):
             for ax in self.figure.axes:
                 for label in ax.get_xticklabels() + ax.get_yticklabels():
                     label.set_fontsize(font_size)
-            self.figure.canvas.draw()
+            self.redraw.full()
         else:
             CustomDialogs.showWarning(self, "Input Error", "Please enter a valid font size.")
     def toggleAxisTitles(self):
@@ -714,7 +682,7 @@ class ChartEditorDialog(QWidget):
             else:
                 ax.set_xlabel(self.x_axis_input.text())
                 ax.set_ylabel(self.y_axis_input.text())
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def toggleLegend(self):
         """Włącz lub wyłącz legendę."""
@@ -726,7 +694,7 @@ class ChartEditorDialog(QWidget):
         else:
             ax1.legend()
 
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def setBlackAndWhiteStyle(self):
         """Ustawia tryb czarno-biały na wykresie i aktualizuje legendę."""
@@ -753,7 +721,7 @@ class ChartEditorDialog(QWidget):
                 collection.remove()
 
         self.toggle_patients_visibility(force_hide=True)
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def setMonthlyRange(self):
         """Ustaw automatyczny zakres miesięczny."""
@@ -765,24 +733,36 @@ class ChartEditorDialog(QWidget):
             ticks = [round(start + i * monthly_tick_step, 10) for i in
                      range(int((end - start) / monthly_tick_step) + 1)]
             ax.set_xticks(ticks)
-        self.figure.canvas.draw()
+        self.applyAtRiskStep(monthly_tick_step)
     def applyXAxisTickStep(self):
         """Zastosuj skok osi X."""
         tick_step = self.x_tick_step_input.text()
         try:
             tick_step = float(tick_step)
+            if tick_step <= 0:
+                raise ValueError(tick_step)
             for ax in self.figure.axes:
                 start, end = ax.get_xlim()
                 if start < 0:
                     start = 0  # Ustaw zawsze początkowy punkt na 0
                 ticks = [round(start + i * tick_step, 10) for i in range(int((end - start) / tick_step) + 1)]
                 ax.set_xticks(ticks)
-            self.figure.canvas.draw()
+            self.applyAtRiskStep(tick_step)
             if not self.black_white_btn.isEnabled():
                 self.toggle_patients_visibility(force_hide=True)
         except ValueError:
             CustomDialogs.showWarning(self, "Input Error", "Please enter a valid tick step.")
 
+    def applyAtRiskStep(self, step):
+        """Liczby pacjentów w ryzyku na wykresie i w tabeli co step lat (jak osie), z dotychczasową widocznością."""
+        self.pomoka_stat.setAtRiskStep(step)
+        for ax in self.figure.axes:
+            for text in ax.texts:
+                x, _ = text.get_position()
+                in_range = self.x_range is None or self.x_range[0] <= x <= self.x_range[1]
+                text.set_visible(self.text_visible and in_range)
+        self.redraw.full()
+
     def applyXAxisRange(self):
         """Ustaw zakres osi X i przytnij liczby pacjentów."""
         try:
@@ -791,6 +771,7 @@ class ChartEditorDialog(QWidget):
             if x_min >= x_max:
                 CustomDialogs.showWarning(self, "Input Error", "Min value must be less than max value.")
                 return
+            self.x_range = (x_min, x_max)
             for ax in self.figure.axes:
                 # Ustaw zakres osi X
                 ax.set_xlim(x_min, x_max)
@@ -803,7 +784,7 @@ class ChartEditorDialog(QWidget):
                     else:
                         text.set_visible(False)  # Ukryj tekst, jeśli jest poza zakresem
             self.reapplyXAxisTickStep()
-            self.figure.canvas.draw()
+            self.redraw.full()
             if not self.black_white_btn.isEnabled():
                 self.toggle_patients_visibility(force_hide=True)
         except ValueError:
@@ -828,7 +809,7 @@ class ChartEditorDialog(QWidget):
                     else:
                         text.set_visible(False)  # Ukryj tekst, jeśli jest poza zakresem
             self.reapplyXAxisTickStep()
-            self.figure.canvas.draw()
+            self.redraw.full()
             if not self.black_white_btn.isEnabled():
                 self.toggle_patients_visibility(force_hide=True)
         except ValueError:
@@ -912,7 +893,7 @@ class ChartEditorDialog(QWidget):
 
             ax1.legend()
 
-            self.figure.canvas.draw()
+            self.redraw.full()
             if not self.black_white_btn.isEnabled():
                 self.toggle_patients_visibility(force_hide=True)
 
@@ -953,7 +934,7 @@ class ChartEditorDialog(QWidget):
             ax.grid(True)
             ax.legend()
 
-            self.figure.canvas.draw()
+            self.redraw.full()
 
             if not self.black_white_btn.isEnabled():
                 self.toggle_patients_visibility(force_hide=True)
@@ -991,36 +972,41 @@ class ChartEditorDialog(QWidget):
             ax.legend()  # Aktualizuj legendę
             for collection in collections:
                 ax.add_collection(collection)
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def addXAxis(self):
         """Dodaje etykiety na osi X."""
         for ax in self.figure.axes:
             ax.set_xlabel(self.x_axis_input.text() or "X-axis")
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def removeXAxis(self):
         """Usuwa etykiety z osi X."""
         for ax in self.figure.axes:
             ax.set_xlabel('')
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def addYAxis(self):
         """Dodaje etykiety na osi Y."""
         for ax in self.figure.axes:
             ax.set_ylabel(self.y_axis_input.text() or "Y-axis")
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def removeYAxis(self):
         """Usuwa etykiety z osi Y."""
         for ax in self.figure.axes:
             ax.set_ylabel('')
-        self.figure.canvas.draw()
+        self.redraw.full()
 
     def close(self):
         """Zamyka okno dialogowe."""
         self.hide()
 
+    def hideEvent(self, event):
+        # zamkniecie (przycisk, X okna, reset wykresu) - nasluch blitowania nie zostaje na wspolnym canvasie
+        self.redraw.disconnect()
+        super().hideEvent(event)
+
 class NonInteractiveComboBox(QComboBox):
     def __init__(self):
         super().__init__()
@@ -1044,6 +1030,11 @@ class POMOKAstat(QWidget):
         self.legend_text = []
         self.results_storage = TestResultsStorage()
         self.data_storage = DataResultsStorage()
+        self.life_tables = LifeTableStore()
+        self.file_cache = ParsedFileCache()  # sparsowane pliki pacjentow - szybkie ponowne wczytanie
+        self.load_task = None  # wczytywanie pliku w tle (Task w QThreadPool)
+        self.execution_task = None  # obliczenia krzywej w tle (Execute / Add next curve)
+        self._busy = False
 
     def interface(self):  # interface apki
         self.setAutoFillBackground(True)
@@ -1089,6 +1080,9 @@ class POMOKAstat(QWidget):
         self.addCurveBtn = QPushButton("&Add next curve", self)
         self.generateReportBtn = QPushButton("&Generate Report", self)
         self.editChartBtn = QPushButton("&Edit Chart", self)
+        self.cancelLoadBtn = QPushButton("&Cancel loading", self)
+        self.taskProgress = QProgressBar(self)
+        self.taskProgress.setTextVisible(True)
 
         # Styl przycisków
         common_button_style = """
@@ -1117,6 +1111,20 @@ class POMOKAstat(QWidget):
         self.addCurveBtn.setStyleSheet(common_button_style)
         self.generateReportBtn.setStyleSheet(common_button_style)
         self.editChartBtn.setStyleSheet(common_button_style)
+        self.cancelLoadBtn.setStyleSheet(common_button_style)
+        self.taskProgress.setStyleSheet("""
+            QProgressBar {
+                color: black;
+                background-color: white;
+                border: 2px solid #0077B6;
+                border-radius: 8px;
+                text-align: center;
+            }
+            QProgressBar::chunk {
+                background-color: #e8f0fe;
+                border-radius: 6px;
+            }
+        """)
 
         # Układ przycisków
         self.ukladV = QVBoxLayout()
@@ -1161,6 +1169,10 @@ class POMOKAstat(QWidget):
 
         # Dodanie przycisków do układu
         self.ukladV.addWidget(self.uploadBtn)
+        self.ukladV.addWidget(self.taskProgress)
+        self.ukladV.addWidget(self.cancelLoadBtn)
+        self.taskProgress.hide()
+        self.cancelLoadBtn.hide()
         self.ukladH.addWidget(self.setRangeBtn)
         self.ukladV.addWidget(self.executeBtn)
         self.ukladH.addWidget(self.addCurveBtn)
@@ -1217,6 +1229,7 @@ class POMOKAstat(QWidget):
 
         # Połączenia sygnałów z funkcjami
         self.uploadBtn.clicked.connect(self.uploadCSV)
+        self.cancelLoadBtn.clicked.connect(self.cancelLoad)
         self.setRangeBtn.clicked.connect(self.setRanges)
         self.addCurveBtn.clicked.connect(self.addCurve)
         self.executeBtn.clicked.connect(self.toggleExecution)
@@ -1269,63 +1282,100 @@ class POMOKAstat(QWidget):
             self.askHeaderRow(fileName)
 
     def askHeaderRow(self, fileName):  # funkcja pytająca o header kolumne
-        row, ok = CustomDialogs.getIntInput(self, "Header Row", "Enter the row number containing column headers:", 1, 1, 100, 1)
+        if fileName.lower().endswith(COLUMNAR_EXTENSIONS):
+            row, ok = 1, True  # Parquet/Feather/Arrow - nazwy kolumn zapisane w schemacie pliku
+        else:
+            row, ok = CustomDialogs.getIntInput(self, "Header Row", "Enter the row number containing column headers:", 1, 1, 100, 1)
 
         if ok:
-            if self.verifyHeaderRow(fileName, row):
-                self.readCSV(fileName, row)
-            else:
-                CustomDialogs.showWarning(self, "Warning",
-                                    "The selected row does not seem to contain valid headers. Please try again.")
+            self.loadFile(fileName, row)
 
-    def verifyHeaderRow(self, fileName, headerRow):  # funkcja weryfikująca nagłówki
+    def loadFile(self, fileName, headerRow):  # wczytanie pliku w tle - okno reaguje, Cancel przerywa
+        if self._busy:
+            return
+        self._busy = True
+        self.uploadBtn.setEnabled(False)
+        self.taskProgress.setRange(0, 0)
+        self.taskProgress.show()
+        self.cancelLoadBtn.setEnabled(True)
+        self.cancelLoadBtn.show()
+
+        self.load_task = Task(self.parseFile, fileName, headerRow)
+        self.load_task.signals.progress.connect(self.progressChanged)
+        self.load_task.signals.finished.connect(self.loadFinished)
+        self.load_task.signals.failed.connect(self.loadFailed)
+        self.load_task.signals.cancelled.connect(self.loadStopped)
+        self.load_task.start()
+
+    def parseFile(self, progress, fileName, headerRow):
+        """Weryfikacja nagłówka i wczytanie danych w wątku roboczym (bez GUI); None - niepoprawny nagłówek."""
+        source = SourceFile(fileName, self.file_cache, progress)  # plik parsowany raz - do weryfikacji naglowka i do wczytania
+        if not valid_headers(source.preview(headerRow)):
+            return None
+        return load_dataset(fileName, headerRow, source)  # (Dataset, opis liczby wierszy)
+
+    def progressChanged(self, done, total, unit):
+        if unit == 'bytes':
+            done, total, unit = done >> 20, total >> 20, 'MB'
+        if total:
+            self.taskProgress.setRange(0, total)
+            self.taskProgress.setValue(min(done, total))
+            self.taskProgress.setFormat(f"%v / %m {unit}")
+        else:
+            self.taskProgress.setRange(0, 0)
+
+    def cancelLoad(self):
+        if self.load_task is not None:
+            self.load_task.cancel()
+            self.cancelLoadBtn.setEnabled(False)
+
+    def loadStopped(self):
+        self._busy = False
+        self.load_task = None
+        self.taskProgress.hide()
+        self.cancelLoadBtn.hide()
+        self.uploadBtn.setEnabled(True)
+
+    def loadFailed(self, message):
+        self.loadStopped()
+        CustomDialogs.showWarning(self, "Error", f"Unable to load file: {message}")
+
+    def loadFinished(self, loaded):
+        self.loadStopped()
+        if loaded is None:
+            CustomDialogs.showWarning(self, "Warning",
+                                "The selected row does not seem to contain valid headers. Please try again.")
+            return
         try:
-            if fileName.endswith('.csv'):
-                df = pd.read_csv(fileName, header=headerRow - 1, nrows=10)  # wczytujemy tylko kilka pierwszych wierszy
-            elif fileName.endswith('.xlsx') or fileName.endswith('.xls'):
-                df = pd.read_excel(fileName, header=headerRow - 1, nrows=10)
-            else:
-                raise ValueError("Unsupported file format")
-
-            headers = df.columns.tolist()
-            if all(isinstance(header, str) and header.strip() != "" for header in headers):
-                return True
-            else:
-                return False
-        except Exception as e:
-            CustomDialogs.showWarning(self, "Error", f"Unable to verify header row: {str(e)}")
-            return False
-
-    def readCSV(self, fileName, headerRow):  # funkcja do wczytania csv/xlsx/xls
-        try:
-            if fileName.endswith('.csv'):
-                df = pd.read_csv(fileName, header=headerRow - 1)
-            elif fileName.endswith('.xlsx') or fileName.endswith('.xls'):
-                df = pd.read_excel(fileName, header=headerRow - 1)
-            else:
-                raise ValueError("Unsupported file format")
-
-            self.df = df
-            CustomDialogs.showInformation(self, "File loaded",
-                                    f"Number of rows: {df.shape[0]}\nNumber of columns: {df.shape[1]}")
-
-            if hasattr(self, 'preferencesList'):
-                self.preferencesList.clear()
-                self.preferencesList.setParent(None)
-                self.preferencesList.deleteLater()
-                self.toggleSetRangeBtn()
-                #self.adjustSize()
-
-            self.executeBtn.setEnabled(True)
-            self.setRangeBtn.setEnabled(True)
-            self.CBpreferences()
-            self.CBtests()
-            self.uploadBtn.hide()
-            self.editChartBtn.show()
-            self.center()
+            self.applyLoadedData(loaded)
         except Exception as e:
             CustomDialogs.showWarning(self, "Error", f"Unable to load file: {str(e)}")
 
+    def applyLoadedData(self, loaded):
+        self.dataset, rows_text = loaded  # nowe dane - krzywe KM sortowane od nowa
+        # procesy puli (spawn + import scipy w kazdym) startuja w tle dopiero przy danych do analizy,
+        # a nie przy otwarciu okna - zanim uzytkownik wybierze zakresy i kliknie Execute
+        threading.Thread(target=warm_up, daemon=True).start()
+        df, self.stream, self.strata_index = self.dataset.df, self.dataset.stream, self.dataset.index
+        self.df = df
+        CustomDialogs.showInformation(self, "File loaded",
+                                f"Number of rows: {rows_text}\nNumber of columns: {df.shape[1]}")
+
+        if hasattr(self, 'preferencesList'):
+            self.preferencesList.clear()
+            self.preferencesList.setParent(None)
+            self.preferencesList.deleteLater()
+            self.toggleSetRangeBtn()
+            #self.adjustSize()
+
+        self.executeBtn.setEnabled(True)
+        self.setRangeBtn.setEnabled(True)
+        self.CBpreferences()
+        self.CBtests()
+        self.uploadBtn.hide()
+        self.editChartBtn.show()
+        self.center()
+
     def CBtests(self):  # wybor testow
         if hasattr(self, 'testsList') and self.testsList is not None:
             self.testsList.deleteLater()
@@ -1334,12 +1384,8 @@ class POMOKAstat(QWidget):
         self.testsList = QListWidget(self)
         self.testsList.setSelectionMode(QAbstractItemView.MultiSelection)
 
-        self.testsList.addItem("Mann-Whitney U test")
-        self.testsList.addItem("AUC")
-        self.testsList.addItem("AUC Interpolated")
-        self.testsList.addItem("Kolomorow Smirnow")
-        self.testsList.addItem("Kolomorow Smirnow Interpolated")
-        self.testsList.addItem("Srednia roznica interpolated")
+        for test_name in TEST_NAMES:
+            self.testsList.addItem(test_name)
         self.testsList.setFixedSize(300, 75)
 
         default_item = self.testsList.findItems("Mann-Whitney U test", Qt.MatchExactly)[0]
@@ -1391,16 +1437,9 @@ class POMOKAstat(QWidget):
                 self.preferencesList.addItem(column)
 
         self.preferencesList.setFixedSize(300, 75)
-        self.selected_sex = 2
-        self.selected_age_start = 0
-        self.selected_age_end = 100
-        self.selected_option = 2
+        self.population_selection = population_selection({})
 
     def setRanges(self):
-        self.selected_sex = 2
-        self.selected_age_start = 0
-        self.selected_age_end = 100
-        self.selected_option = 2
         self.column_ranges = {}
 
         # Retrieve selected columns from preferences
@@ -1410,9 +1449,6 @@ class POMOKAstat(QWidget):
             if column == 'no preferences':
                 continue
 
-            values = self.df[column].unique().tolist()
-            values = [str(value) for value in values]
-
             while True:  # Loop to allow retry on invalid input
                 value_range, ok = CustomDialogs.getTextInput(
                     self,
@@ -1424,105 +1460,13 @@ class POMOKAstat(QWidget):
                     break  # Exit if user cancels the dialog
 
                 try:
-                    # Check if input is a numeric range (e.g., "1-10")
-                    if '-' in value_range:
-                        # Ensure the format is strictly numeric (e.g., "min-max")
-                        if not re.match(r"^\d+-\d+$", value_range.strip()):
-                            CustomDialogs.showWarning(
-                                self,
-                                "Format Error",
-                                f"Invalid range format for column '{column}'. Please enter a valid numeric range: MINIMUM-MAXIMUM."
-                            )
-                            continue
-
-                        lower, upper = map(int, value_range.split('-'))
-
-                        # Check if lower bound is less than or equal to upper bound
-                        if lower > upper:
-                            CustomDialogs.showWarning(
-                                self,
-                                "Range Error",
-                                f"Invalid range: the lower bound ({lower}) cannot be greater than the upper bound ({upper})."
-                            )
-                            continue
-
-                        column_values = self.df[column]
-
-                        # Filter values in the range
-                        filtered_values = column_values[(column_values >= lower) & (column_values <= upper)]
-
-                        if filtered_values.empty:
-                            CustomDialogs.showWarning(
-                                self,
-                                "Range Error",
-                                f"No values found in column '{column}' for the range: {lower}-{upper}."
-                            )
-                            continue
-
-                        # Handle special cases for specific columns (e.g., age, sex)
-                        if column.lower() in ['age', 'wiek']:
-                            if lower == upper:
-                                self.selected_age = lower
-                                self.selected_option = 1
-                            else:
-                                self.selected_age_start = lower
-                                self.selected_age_end = upper
-                                self.selected_option = 2
-
-                        if column.lower() in ['sex', 'plec', 'płeć', 'pŁeć', 'male', 'mezczyzna', 'mężczyzna']:
-                            value = 2
-                            if lower == upper:
-                                value = lower
-                                if value in [1, 'm', 'male']:
-                                    self.selected_sex = 0  # 0=dane_mezczyzn
-                                elif value in [0, 'k', 'female', 'w', 'f']:
-                                    self.selected_sex = 1  # 1=dane_kobiet
-                            else:
-                                self.selected_sex = 2
-                        if column.lower() in ['female', 'kobieta']:
-                            value = 2
-                            if lower == upper:
-                                value = lower
-                                if value in [1, 'k', 'female', 'w', 'f']:
-                                    self.selected_sex = 1  # 1=dane_kobiet
-                                elif value in [0, 'm', 'male']:
-                                    self.selected_sex = 0  # 0=dane_mezczyzn
-                            else:
-                                self.selected_sex = 2
-
-                        self.column_ranges[column] = ('numeric', (lower, upper))
-                        break
-
-                    # Check if input is a comma-separated list of values (e.g., "SVG,MVG")
-                    elif ',' in value_range or value_range.strip():
-                        value_list = [val.strip() for val in value_range.split(',')]
-
-                        # Verify if all entered values exist in the column
-                        if not set(value_list).issubset(set(values)):
-                            CustomDialogs.showWarning(
-                                self,
-                                "Value Error",
-                                f"Some values in '{value_range}' do not exist in column '{column}'."
-                            )
-                            continue
-
-                        self.column_ranges[column] = ('categorical', value_list)
-                        break
+                    self.column_ranges[column] = parse_range(column, value_range, self.strata_index)
+                    break
+                except RangeError as e:
+                    CustomDialogs.showWarning(self, e.title, str(e))
 
-                    else:
-                        CustomDialogs.showWarning(
-                            self,
-                            "Input Error",
-                            "Please enter a valid range (e.g., 'MINIMUM-MAXIMUM' or 'value1,value2,...')."
-                        )
-                        continue
-
-                except ValueError:
-                    CustomDialogs.showWarning(
-                        self,
-                        "Input Error",
-                        "Invalid input. Please enter a valid numeric range or a comma-separated list of values."
-                    )
+        # wiek i płeć krzywej GUS z zakresów kolumn age/sex
+        self.population_selection = population_selection(self.column_ranges)
 
     def closeEvent(self, event):  # zapytanie przed zamknieciem aplikacji
         odp = CustomDialogs.showQuestion(
@@ -1530,6 +1474,8 @@ class POMOKAstat(QWidget):
             "Are you sure you want to close?"
         )
         if odp == QMessageBox.Yes:
+            self.cancelLoad()
+            self.cancelExecution()
             event.accept()
         else:
             event.ignore()
@@ -1550,118 +1496,90 @@ class POMOKAstat(QWidget):
             base_path = os.path.dirname(os.path.abspath(sys.argv[0]))
         return os.path.join(base_path, relative_path)
 
-    def gus(self, ax, last_time_km):  # TODO
-        # dwie zmienne podawane do funkcji generujacej wykres dla jednego rocznika
-        ##DEBUG
-        # print("=== DEBUG: START OF FUNCTION 'gus' ===")
-        # print(f"Selected sex: {self.selected_sex}")
-        # print(f"Selected age: {self.selected_age}")
-        # print(f"Selected age start: {self.selected_age_start}")
-        # print(f"Selected age end: {self.selected_age_end}")
-        # print(f"Selected option: {self.selected_option}")
-        # print(f"Last time KM: {last_time_km}")
-        # print("=====================================")
-        os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
-
-        sex = self.selected_sex
-
-        # BACKLOG jak działa:
-        # self.selected_age = wiek pacjenta
-        # self.selected_age_start = wiek pacjenta dolny zakres
-        # self.selected_age_end = wiek pacjenta gorny zakres
-        # zakres 65-70 to wtedy start = 1952, a end = 1957, a wiec z tego powodu jest to na odwrot
-
-        # te dwie plus sex generuje wykres dla zakresu rocznikow
-        opcja = self.selected_option  # czyli czy generujemy wykres dla jednego rocznika czy zakresu, 2 to zakres
-        file_path = self.resource_path("data/population_data.xlsx")
-        file_path_men = self.resource_path("data/preprocessed_male.xlsx")
-        file_path_women = self.resource_path("data/preprocessed_female.xlsx")
-        file_path_all = self.resource_path("data/preprocessed_general.xlsx")
-        # print(f"koncowy_gus:{self.selected_sex}")
-        if sex == 0:
-            sextext = 'men'
-        if sex == 1:
-            sextext = 'women'
-        if sex == 2:
-            sextext = 'men and women'
-        # tworzenie plikow jesli nie istnieja (w przyszlosci przyda sie do aktualizacji danych)
-        if not os.path.exists(file_path_men) or not os.path.exists(file_path_women) or not os.path.exists(
-                file_path_all):
-            tab_m, tab_k = prepare_data(file_path)
-            save_data_to_excel(file_path_men, file_path_women, file_path_all, tab_m, tab_k)
-
-        if opcja == 1:
-            year = (2022 - self.selected_age)
-            gus_chart = lineChartOne(sex, year)
-            # pobranie osi z figury wykresu z GUS
-            gus_ax = gus_chart.axes[0]
-
-            # pobranie danych z osi wykresu GUS
-            self.x_data = gus_ax.lines[0].get_xdata()  # Oś X (lata)
-            self.y_data = gus_ax.lines[0].get_ydata()  # Oś Y (procenty przeżycia)
-            # przekształcenie procentów przeżycia na prawdopodobieństwa (0-1)
-            self.y_data_probability = self.y_data / 100
-
-            # przycinanie osi X do dlugosci kmf (tylko dla testów)
-            valid_indices = self.x_data <= last_time_km
-            self.x_data_trimmed = self.x_data[valid_indices]
-            self.y_data_probability_trimmed = self.y_data_probability[valid_indices]
-
-            # dodanie drugiej krzywej na ten sam wykres Kaplan-Meiera
-            agetext = 2022 - year
-            # print (f'{self.selected_sex}')
-            # print (f'{sex}')
-            ax.step(self.x_data_trimmed, self.y_data_probability_trimmed, where='post',
-                    #label=f'HEALTHY (age: {agetext}; sex: {sextext})',
-                    label=f'POPULATION DATA',
-                    linestyle='-', color='orange')
-
-            # Ustaw widoczny zakres osi X za pomocą ChartEditorDialog
-            chart_editor = ChartEditorDialog(ax.get_figure(), self)
-            chart_editor.x_range_min_input.setText("-0.5")
-            chart_editor.x_range_max_input.setText(str(last_time_km + 0.5))
-            chart_editor.applyXAxisRange()
-            #self.guslegend = f'HEALTHY (age: {agetext}; sex: {sextext})'
-            self.guslegend = f'POPULATION DATA'
+    def gus(self, ax, last_time_km, population):  # krzywa GUS na wykresie KM (population - z engine.curve_results)
+        (self.x_data, self.y_data, self.y_data_probability,
+         self.x_data_trimmed, self.y_data_probability_trimmed) = population
 
-            ax.legend()
+        # dodanie drugiej krzywej na ten sam wykres Kaplan-Meiera
+        draw_population_curve(ax, population)
+
+        # widoczny zakres osi X (liczby pacjentów poza zakresem ukryte)
+        set_time_range(ax, -0.5, last_time_km + 0.5)
+        #self.guslegend = f'HEALTHY (age: {agetext}; sex: {sextext})'
+        self.guslegend = f'POPULATION DATA'
+        ax.legend()
 
-        if opcja == 2:
-            year_start = (2022 - self.selected_age_end)
-            year_end = (2022 - self.selected_age_start)
-            gus_chart = lineChartRange(sex, year_start, year_end)
-            gus_ax = gus_chart.axes[0]
-
-            # pobranie danych z osi wykresu GUS
-            self.x_data = gus_ax.lines[0].get_xdata()  # Oś X (lata)
-            self.y_data = gus_ax.lines[0].get_ydata()  # Oś Y (procenty przeżycia)
-            # przekształcenie procentów przeżycia na prawdopodobieństwa (0-1)
-            self.y_data_probability = self.y_data / 100
-
-            # przycinanie osi X do dlugosci kmf (tylko dla testów)
-            valid_indices = self.x_data <= last_time_km
-            self.x_data_trimmed = self.x_data[valid_indices]
-            self.y_data_probability_trimmed = self.y_data_probability[valid_indices]
-
-            # dodanie drugiej krzywej na ten sam wykres Kaplan-Meiera
-            agetextstart = 2022 - year_start
-            agetextend = 2022 - year_end
-            ax.step(self.x_data_trimmed, self.y_data_probability_trimmed, where='post',
-                    #label=f'HEALTHY (age: {agetextend}-{agetextstart}; sex: {sextext})',
-                    label=f'POPULATION DATA',
-                    linestyle='-', color='orange')
-
-            # Ustaw widoczny zakres osi X za pomocą ChartEditorDialog
-            chart_editor = ChartEditorDialog(ax.get_figure(), self)
-            chart_editor.x_range_min_input.setText("-0.5")
-            chart_editor.x_range_max_input.setText(str(last_time_km + 0.5))
-            chart_editor.applyXAxisRange()
-            #self.guslegend = f'HEALTHY (age: {agetextend}-{agetextstart}; sex: {sextext})'
-            self.guslegend = f'POPULATION DATA'
-            ax.legend()
         curve_id="GUS"
         self.data_storage.add_data(curve_id, self.y_data_probability_trimmed)
 
+    def runCurveTask(self, show, *args):
+        """Uruchamia curveResults(*args) w QThreadPool; show(wynik) rysuje krzywą w wątku GUI.
+
+        Na czas obliczeń przyciski i listy są zablokowane, a Execute działa jako Break (przerwanie).
+        """
+        self._busy = True
+        self.execution_show = show
+        self.execution_controls = [(widget, widget.isEnabled()) for widget in
+                                   (self.setRangeBtn, self.addCurveBtn, self.generateReportBtn, self.editChartBtn,
+                                    self.preferencesList, self.testsList)]
+        self.execution_text = self.executeBtn.text()
+        for widget, _ in self.execution_controls:
+            widget.setEnabled(False)
+        self.executeBtn.setText("Break")
+        self.executeBtn.setEnabled(True)
+        self.taskProgress.setRange(0, 0)
+        self.taskProgress.show()
+
+        self.execution_task = Task(self.curveResults, *args)
+        self.execution_task.signals.progress.connect(self.progressChanged)
+        self.execution_task.signals.finished.connect(self.executionFinished)
+        self.execution_task.signals.failed.connect(self.executionFailed)
+        self.execution_task.signals.cancelled.connect(self.executionStopped)
+        self.execution_task.start()
+
+    def curveResults(self, progress, curve_id, selected_preferences, time_column, event_column, selected_tests,
+                     population):
+        """Obliczenia krzywej bez GUI (wątek roboczy): filtrowanie, KM, krzywa GUS i wybrane testy (engine.curve_results).
+
+        population - krzywa GUS pierwszej krzywej (None - liczona dla tej krzywej). None, gdy brak pacjentów.
+        """
+        # jeśli jest 'no preferences', pomijamy filtrowanie
+        column_ranges = {} if "no preferences" in selected_preferences else self.column_ranges
+        computed = curve_results(self.dataset, column_ranges, time_column, event_column, selected_tests,
+                                 self.life_tables, self.population_selection, population, self.resource_path(""),
+                                 progress, executor=process_pool())
+        if computed is not None:
+            computed['curve_id'] = curve_id
+        return computed
+
+    def recordTestResults(self, curve_id, tests):
+        for test_name, result, message in tests:
+            self.results_storage.add_result(test_name, curve_id, result)
+            self.resultCmb.addItem(message)
+        print("Wszystkie wyniki:", self.results_storage.get_all_results())
+
+    def cancelExecution(self):
+        if self.execution_task is not None:
+            self.execution_task.cancel()
+            self.executeBtn.setEnabled(False)
+
+    def executionStopped(self):
+        for widget, enabled in self.execution_controls:
+            widget.setEnabled(enabled)
+        self.executeBtn.setText(self.execution_text)
+        self.executeBtn.setEnabled(True)
+        self.taskProgress.hide()
+        self.execution_task = None
+        self._busy = False
+
+    def executionFailed(self, message):
+        self.executionStopped()
+        CustomDialogs.showWarning(self, "Error", f"Execution failed: {message}")
+
+    def executionFinished(self, computed):
+        self.executionStopped()
+        self.execution_show(computed)
+
     def update_legend_widget(self):
         if not hasattr(self, 'text_widget'):
             self.text_widget = QLabel()
@@ -1741,121 +1659,72 @@ class POMOKAstat(QWidget):
                     CustomDialogs.showWarning(self, "Error", "No preferences selected.")
                     return
 
-        df_filtered = self.df.copy()
-
-        # filtrowanie po wszystkich kolumnach wedlug set range lower/upper
-        for column, (range_type, values) in self.column_ranges.items():
-            if "no preferences" in selected_preferences:
-                continue  # jeśli jest 'no preferences', pomijamy filtrowanie tej kolumny
-            if range_type == 'numeric':
-                lower, upper = values
-                df_filtered = df_filtered[(df_filtered[column] >= lower) & (df_filtered[column] <= upper)]
-            elif range_type == 'categorical':
-                df_filtered = df_filtered[df_filtered[column].isin(values)]
-
-        if df_filtered.empty:
-            CustomDialogs.showWarning(self, "Error", "No data matching the selected ranges.")
-            return
-
-
-        # sprawdzamy, czy kolumny 'time' i 'event' istnieją
-        if 'time' in df_filtered.columns:
-            self.T_ill = df_filtered['time']
+        # sprawdzamy, czy kolumny 'time' i 'event' istnieją (przed filtrowaniem - duży CSV czyta tylko potrzebne kolumny)
+        if 'time' in self.df.columns:
+            time_column = 'time'
         else:
             # jeśli nie znajdzie 'time', prosi użytkownika o wybór kolumny
-            column_names = df_filtered.columns.tolist()
+            column_names = self.df.columns.tolist()
             self.selected_column_time, ok = CustomDialogs.getItemSelection(self, "Select column for 'time'",
                                                        "Available columns:", column_names, 0)
             if ok and self.selected_column_time:
-                self.T_ill = df_filtered[self.selected_column_time]
+                time_column = self.selected_column_time
             else:
                 CustomDialogs.showWarning(self, "Error", "No column selected for 'time'.")
                 return
 
-        if 'event' in df_filtered.columns:
-            self.E_ill = df_filtered['event']
+        if 'event' in self.df.columns:
+            event_column = 'event'
         else:
             # jeśli nie znajdzie 'event', poproś użytkownika o wybór kolumny
-            column_names = df_filtered.columns.tolist()
+            column_names = self.df.columns.tolist()
             self.selected_column_event, ok = CustomDialogs.getItemSelection(self, "Select column for 'event'",
                                                        "Available columns:", column_names, 0)
             if ok and self.selected_column_event:
-                self.E_ill = df_filtered[self.selected_column_event]
+                event_column = self.selected_column_event
             else:
                 CustomDialogs.showWarning(self, "Error", "No column selected for 'event'.")
                 return
 
-        kmf_ill = KaplanMeierFitter()
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        kmf_ill.fit(self.T_ill, event_observed=self.E_ill)
-
         # Tworzenie opisu dla legendy na podstawie preferencji i zakresów
-        preferences_description = "; ".join([
-            f"{pref}: {self.column_ranges[pref][1][0]}-{self.column_ranges[pref][1][1]}" if self.column_ranges[pref][
-                                                                                                0] == 'numeric' else f"{pref}: {', '.join(self.column_ranges[pref][1])}"
-            for pref in selected_preferences if pref in self.column_ranges
-        ])
-        #label_text = f'ILL ({preferences_description})'
-        label_text = f'PATIENT DATA'
-        kmf_ill.plot_survival_function(ax=ax, label=label_text)
-        ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)
-
-        # pobieranie danych z wykresu kaplana
-        self.survival_probabilities = kmf_ill.survival_function_['KM_estimate'].values
-        self.time_points = kmf_ill.survival_function_.index
-
-        last_time_km = kmf_ill.survival_function_.index[-1]
+        preferences_description = describe_ranges(self.column_ranges, selected_preferences)
 
-        survival_values = kmf_ill.survival_function_['KM_estimate']
-        n_at_risk = kmf_ill.event_table['at_risk']
-        time_intervals = range(0, int(last_time_km) + 1, 2)  # zakres co 2 lata
-
-        line_color = ax.lines[-1].get_color()
-        step = 0.02
-        initial_offset_x = 0.5
-
-        for t in time_intervals:
-
-            closest_time = min(n_at_risk.index, key=lambda x: abs(x - t))
-            patients_at_t = n_at_risk.loc[closest_time]
-            survival_at_t = survival_values.loc[closest_time]
-
-            adjusted_x = t + initial_offset_x
-            adjusted_y = survival_at_t + 0.05
+        # filtrowanie, KM, krzywa GUS i testy w tle; wykres po zakończeniu (showExecution)
+        selected_tests = [item.text() for item in self.testsList.selectedItems()]
+        self.runCurveTask(self.showExecution, preferences_description, selected_preferences, time_column,
+                          event_column, selected_tests, None)
 
-            while adjusted_y <= survival_at_t + step:
-                adjusted_y += step
+    def showIll(self, computed):  # wykres i tabela pierwszej krzywej z wyników curveResults
+        self.ill_correct = 0
+        if computed is None:
+            CustomDialogs.showWarning(self, "Error", "No data matching the selected ranges.")
+            return
+        preferences_description = computed['curve_id']
+        _, self.T_ill, self.E_ill = computed['patients']
+        km_ill = computed['km']
 
-            # rysowanie prostokąta jako obramowanie dla tekstu
-            '''bbox_width = 0.5  # Szerokość prostokąta
-            bbox_height = 0.1  # Wysokość prostokąta
-            rect = plt.Rectangle(
-                (adjusted_x - bbox_width / 2, adjusted_y - bbox_height / 2),  # Lewy dolny róg prostokąta
-                bbox_width,  # Szerokość
-                bbox_height,  # Wysokość
-                linewidth=1,  # Grubość linii
-                edgecolor='red',  # Kolor linii
-                facecolor='none',  # Bez wypełnienia
-                alpha=0.9  # Przezroczystość
-            )
-            ax.add_patch(rect)'''
-            #
+        # Figure poza menedzerem pyplot - zwalniana razem z canvasem, nie zostaje w pamieci po kolejnych Execute
+        fig = Figure(figsize=(10, 6))
+        ax = fig.add_subplot()
 
-            ax.text(adjusted_x, adjusted_y,
-                str(patients_at_t),
-                ha='center', fontsize=8, fontweight='bold',  # Grubszy tekst
-                color=line_color, alpha=0.9,  # Kolor tekstu
-                verticalalignment='bottom',
-                path_effects=[withStroke(linewidth=3, foreground="white")])
+        #label_text = f'ILL ({preferences_description})'
+        label_text = f'PATIENT DATA'
+        # krzywa z liczbą pacjentów w ryzyku co 2 lata i opisami osi; te same liczby trafiają do tabeli
+        self.at_risk_step = AT_RISK_STEP  # skok zmieniany w edytorze wykresu (setAtRiskStep)
+        self.label_layout = at_risk_layout(self.at_risk_step)  # napisy wszystkich krzywych tego wykresu
+        at_risk_times, at_risk_counts, _ = draw_first_curve(ax, km_ill, label_text, self.at_risk_step,
+                                                            self.label_layout)
+        # krzywe z liczbami pacjentów (km, kolor, przesunięcie) - do ponownego rysowania liczb z innym skokiem
+        self.at_risk_ax = ax
+        self.at_risk_curves = [(km_ill, ax.lines[-1].get_color(), None)]
 
-        #ax.set_title('Chart')
-        ax.set_xlabel('Time [years]')
-        ax.set_ylabel('Survival Probability')
+        # pobieranie danych z wykresu kaplana
+        self.survival_probabilities = km_ill.survival
+        self.time_points = km_ill.times
 
-        plt.grid(True)
+        last_time_km = km_ill.times[-1]
 
-        self.gus(ax, last_time_km)
+        self.gus(ax, last_time_km, computed['population'])
 
         if hasattr(self, 'canvas') and self.canvas:
             self.canvas.setParent(None)
@@ -1866,15 +1735,10 @@ class POMOKAstat(QWidget):
         self.canvas = FigureCanvas(fig)
         self.ukladV.addWidget(self.canvas, 1, Qt.AlignBottom)
         self.canvas.draw()
-        # Etykiety kolumn (wartości osi X)
-        col_labels = [str(t) for t in time_intervals]
-
-        # Pobranie wartości liczby pacjentów na ryzyku w danym czasie
-        values_row = [str(n_at_risk.loc[min(n_at_risk.index, key=lambda x: abs(x - t))]) for t in time_intervals]
 
-        # Utworzenie tabeli (2 wiersze: Time + wartości)
-        num_columns = len(col_labels) + 1  # Liczba kolumn (dodatkowa na Time/Preferences)
-        table_widget = QTableWidget(2, num_columns)
+        # Utworzenie tabeli (2 wiersze: Time + wartości); kolumny z chwilami wypełnia fillAtRiskTable
+        table_widget = QTableWidget(2, 1)
+        self.at_risk_table = table_widget
 
         # styl tabeli
 
@@ -1915,11 +1779,6 @@ class POMOKAstat(QWidget):
         table_widget.setItem(0, 0, QTableWidgetItem("Time [years]"))
         table_widget.setItem(1, 0, QTableWidgetItem(preferences_description))
 
-        # Ustawienie danych w tabeli
-        for col, value in enumerate(values_row):
-            table_widget.setItem(0, col + 1, QTableWidgetItem(col_labels[col]))  # Czas w górnym wierszu
-            table_widget.setItem(1, col + 1, QTableWidgetItem(value))  # Wartości w dolnym wierszu
-
         # Dostosowanie szerokości tabeli
         table_width = self.width() - 40  # Całkowita szerokość tabeli
         table_height = 100  # Wysokość tabeli
@@ -1927,18 +1786,10 @@ class POMOKAstat(QWidget):
         table_widget.setFixedSize(table_width, table_height)  # Blokowanie rozmiaru
         table_widget.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
 
-        # Dopasowanie szerokości kolumn
-        first_column_width = 100  # Ręczne dopasowanie szerokości pierwszej kolumny
-        remaining_width = table_width - first_column_width - 40  # Pozostała szerokość
-        column_width = remaining_width // (num_columns - 1)  # Równy podział na pozostałe kolumny
-
-        table_widget.setColumnWidth(0, first_column_width)  # Dopasowanie szerokości pierwszej kolumny
-
-        for col in range(1, num_columns):
-            table_widget.setColumnWidth(col, column_width)  # Pozostałe kolumny równo rozłożone
+        # Liczba pacjentów w ryzyku w danym czasie - wyliczona raz, przy rysowaniu krzywej
+        self.fillAtRiskTable(at_risk_times, at_risk_counts)
 
         table_widget.setEditTriggers(QTableWidget.NoEditTriggers)
-        table_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         table_widget.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         table_widget.setShowGrid(True)
 
@@ -2006,9 +1857,44 @@ class POMOKAstat(QWidget):
         self.center()
         self.ill_correct = 1
 
-        return preferences_description
 
 
+    def fillAtRiskTable(self, times, counts):  # kolumny tabeli: chwila i liczba pacjentów w ryzyku
+        table_widget = self.at_risk_table
+        num_columns = len(times) + 1  # Liczba kolumn (dodatkowa na Time/Preferences)
+        table_widget.setColumnCount(num_columns)
+        for col, (t, n) in enumerate(zip(times, counts), start=1):
+            table_widget.setItem(0, col, QTableWidgetItem(tick_label(t)))  # Czas w górnym wierszu
+            table_widget.setItem(1, col, QTableWidgetItem(str(n)))  # Wartości w dolnym wierszu
+
+        # Dopasowanie szerokości kolumn
+        first_column_width = 100  # Ręczne dopasowanie szerokości pierwszej kolumny
+        remaining_width = table_widget.width() - first_column_width - 40  # Pozostała szerokość
+        column_width = remaining_width // (num_columns - 1)  # Równy podział na pozostałe kolumny
+        header = table_widget.horizontalHeader()
+        if column_width >= 40:
+            header.setSectionResizeMode(QHeaderView.Stretch)
+            table_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        else:
+            # gęsty skok (np. co miesiąc) - kolumny o stałej szerokości i przewijanie tabeli
+            header.setSectionResizeMode(QHeaderView.Fixed)
+            table_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+            column_width = 40
+        table_widget.setColumnWidth(0, first_column_width)  # Dopasowanie szerokości pierwszej kolumny
+        for col in range(1, num_columns):
+            table_widget.setColumnWidth(col, column_width)  # Pozostałe kolumny równo rozłożone
+
+    def setAtRiskStep(self, step):  # liczby pacjentów w ryzyku na wykresie i w tabeli co step lat (edytor wykresu)
+        self.at_risk_step = step = max(step, AT_RISK_MIN_STEP)
+        ax = self.at_risk_ax
+        for text in list(ax.texts):
+            text.remove()
+        self.label_layout = at_risk_layout(step)
+        (km, color, _), *next_curves = self.at_risk_curves
+        at_risk_times, at_risk_counts, _ = draw_first_at_risk(ax, km, color, step, self.label_layout)
+        for km, color, offset in next_curves:
+            draw_next_at_risk(ax, km, color, offset, step, self.label_layout)
+        self.fillAtRiskTable(at_risk_times, at_risk_counts)
 
     def addCurve(self):
         if not hasattr(self, 'df'):
@@ -2041,145 +1927,65 @@ class POMOKAstat(QWidget):
                     CustomDialogs.showWarning(self, "Error", "No preferences selected.")
                     return
 
-        df_filtered = self.df.copy()
-
-        for column, (range_type, values) in self.column_ranges.items():
-            if "no preferences" in selected_preferences:
-                continue  # jeśli jest 'no preferences', pomijamy filtrowanie tej kolumny
-            if range_type == 'numeric':
-                lower, upper = values
-                df_filtered = df_filtered[(df_filtered[column] >= lower) & (df_filtered[column] <= upper)]
-            elif range_type == 'categorical':
-                df_filtered = df_filtered[df_filtered[column].isin(values)]
-
-        if df_filtered.empty:
-            CustomDialogs.showWarning(self, "Error", "No data matching the selected ranges.")
-            return
-
-
-        if 'time' in df_filtered.columns:
-            T_additional = df_filtered['time']
+        if 'time' in self.df.columns:
+            time_column = 'time'
         else:
             if self.selected_column_time:
-                T_additional = df_filtered[self.selected_column_time]
+                time_column = self.selected_column_time
             else:
                 CustomDialogs.showWarning(self, "Error", "No column selected for 'time'.")
                 return
 
-        if 'event' in df_filtered.columns:
-            E_additional = df_filtered['event']
+        if 'event' in self.df.columns:
+            event_column = 'event'
         else:
             if self.selected_column_event:
-                E_additional = df_filtered[self.selected_column_event]
+                event_column = self.selected_column_event
             else:
                 CustomDialogs.showWarning(self, "Error", "No column selected for 'event'.")
                 return
 
-        kmf_additional = KaplanMeierFitter()
-
         if not hasattr(self, 'canvas') or self.canvas is None:
             CustomDialogs.showWarning(self, "Error", "No existing plot to add a curve.")
             return
 
         ax = self.canvas.figure.axes[0]
 
-        predefined_colors = [
-            '#1f77b4',  # niebieski
-            '#ff7f0e',  # pomarańczowy
-            '#2ca02c',  # zielony
-            '#d62728',  # czerwony
-            '#9467bd',  # fioletowy
-            '#8c564b',  # brązowy
-            '#e377c2',  # różowy
-            '#7f7f7f',  # szary
-        ]
-
-        existing_lines = len(ax.lines)
-        if existing_lines >= len(predefined_colors):
+        if curve_color(ax) is None:
             CustomDialogs.showWarning(self, "Error", "No more unique colors available.")
             return
 
-        selected_color = predefined_colors[existing_lines]
-
         # Tworzenie opisu dla legendy na podstawie preferencji i zakresów
-        preferences_description = "; ".join([
-            f"{pref}: {self.column_ranges[pref][1][0]}-{self.column_ranges[pref][1][1]}" if self.column_ranges[pref][
-                                                                                                0] == 'numeric' else f"{pref}: {', '.join(self.column_ranges[pref][1])}"
-            for pref in selected_preferences if pref in self.column_ranges
-        ])
+        preferences_description = describe_ranges(self.column_ranges, selected_preferences)
 
-        kmf_additional.fit(T_additional, event_observed=E_additional)
+        # obliczenia w tle, testy względem krzywej GUS pierwszej krzywej; wykres po zakończeniu (showAdditionalCurve)
+        selected_tests = [item.text() for item in self.testsList.selectedItems()]
+        population = (self.x_data, self.y_data, self.y_data_probability, self.x_data_trimmed,
+                      self.y_data_probability_trimmed)
+        self.runCurveTask(self.showAdditionalCurve, preferences_description, selected_preferences, time_column,
+                          event_column, selected_tests, population)
+
+    def showAdditionalCurve(self, computed):  # kolejna krzywa na istniejącym wykresie z wyników curveResults
+        if computed is None:
+            CustomDialogs.showWarning(self, "Error", "No data matching the selected ranges.")
+            return
+        ax = self.canvas.figure.axes[0]
+        selected_color = curve_color(ax)
+        preferences_description = computed['curve_id']
+        km_additional = computed['km']
         label_text = f'ILL ({preferences_description})'
-        kmf_additional.plot_survival_function(ax=ax, label=label_text, color=selected_color)
-        ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)
+        # krzywa z liczbą pacjentów w ryzyku, przesuniętą w pionie względem poprzednich krzywych
+        draw_next_curve(ax, km_additional, label_text, selected_color, self.global_iteration_offset,
+                        self.at_risk_step, self.label_layout)
+        self.at_risk_curves.append((km_additional, selected_color, self.global_iteration_offset))
+        self.global_iteration_offset += NEXT_CURVE_OFFSET
         ax.legend().remove()
 
         self.legend_text.append(label_text)
         self.update_legend_widget()
-        last_time_km = kmf_additional.survival_function_.index[-1]
-
-        # Sprawdź aktualny zakres osi X i przedłuż go w razie potrzeby
-        current_xlim = ax.get_xlim()
-        if last_time_km > current_xlim[1]:
-            ax.set_xlim(current_xlim[0], last_time_km + 0.5)  # Przedłuż zakres osi X o 0.5
-            print(f"Extended X-axis range: {current_xlim[0]} to {last_time_km + 0.5}")
-
-        time_intervals = range(0, int(last_time_km) + 1, 2)  # zakres co 2 lata
-        survival_values = kmf_additional.survival_function_['KM_estimate']
-        n_at_risk = kmf_additional.event_table['at_risk']
-
-        self.time_points = kmf_additional.survival_function_.index.tolist()
-        self.survival_probabilities = kmf_additional.survival_function_['KM_estimate'].tolist()
-
-        global is_first_call, global_iteration_offset_y  # Użycie globalnej zmiennej
-        drawn_text_positions = []
-        offset_step_y = 0.2
-        initial_offset_x = -0.3
-
-        for t in time_intervals:
-            closest_time = min(n_at_risk.index, key=lambda x: abs(x - t))
-            patients_at_t = n_at_risk.loc[closest_time]
-            survival_at_t = survival_values.loc[closest_time]
-
-            # Specjalne przesunięcie dla timeline = 0
-            adjusted_x = t + initial_offset_x  # Pozycja w osi X pozostaje bez zmian
-            adjusted_y = survival_at_t - self.global_iteration_offset  # Przesunięcie w pionie dla kolejnych iteracji
-            # Sprawdzenie kolizji z wcześniej dodanym tekstem
-            while any(abs(adjusted_x - x) < 0.5 and abs(adjusted_y - y) < 0.05 for x, y in drawn_text_positions):
-                adjusted_y += 0.01  # Standardowy krok przesunięcia w osi Y
-
-            # Odbicie tekstu i prostokąta, jeśli Y jest poniżej 0.05
-            if adjusted_y < 0.05:
-                adjusted_y = abs(adjusted_y)
-                if adjusted_y > 0.15:
-                    adjusted_y -= 0.10  # Odbicie w osi Y
-                adjusted_x += 0.60  # Przesunięcie w osi X
-
-            # rysowanie prostokąta jako obramowanie dla tekstu
-            '''bbox_width = 0.5  # Szerokość prostokąta
-            bbox_height = 0.1  # Wysokość prostokąta
-            rect = plt.Rectangle(
-            (adjusted_x - bbox_width / 2, adjusted_y - bbox_height / 2),  # Lewy dolny róg prostokąta
-                bbox_width,  # Szerokość
-                bbox_height,  # Wysokość
-                linewidth=1,  # Grubość linii
-                edgecolor='red',  # Kolor linii
-                facecolor='none',  # Bez wypełnienia
-                alpha=0.1  # Przezroczystość
-            )
-            ax.add_patch(rect)'''
-            #
-
-            # Rysowanie tekstu
-            ax.text(adjusted_x, adjusted_y,
-                    str(patients_at_t),
-                    ha='center', fontsize=8, fontweight='bold',  # Grubszy tekst
-                    color=selected_color, alpha=0.9,  # Kolor tekstu
-                    verticalalignment='bottom',
-                    path_effects=[withStroke(linewidth=3, foreground="white")])  # Obramowanie
-            drawn_text_positions.append((adjusted_x, adjusted_y))  # Dodanie nowej pozycji tekstu do listy
-
-        self.global_iteration_offset += (offset_step_y/3)
+
+        self.time_points = km_additional.times.tolist()
+        self.survival_probabilities = km_additional.survival.tolist()
         self.canvas.draw()
 
         now = datetime.now()
@@ -2200,21 +2006,7 @@ class POMOKAstat(QWidget):
         self.data_storage.add_data(curve_id, self.survival_probabilities)
         data_result = self.data_storage.get_all_data()
         print("Data reult:", data_result)
-        selected_tests = [item.text() for item in self.testsList.selectedItems()]
-        # results_storage = TestResultsStorage()
-        for test in selected_tests:
-            if test == "AUC":
-                self.run_AUC(curve_id)
-            elif test == "Kolomorow Smirnow":
-                self.run_KS_test(curve_id)
-            elif test == "AUC Interpolated":
-                self.run_AUC_interpolated(curve_id)
-            elif test == "Kolomorow Smirnow Interpolated":
-                self.run_KS_test_interpolated(curve_id)
-            elif test == "Srednia roznica interpolated":
-                self.run_mean_diff(curve_id)
-            elif test == "Mann-Whitney U test":
-                self.run_mann_whitney_u(curve_id)
+        self.recordTestResults(curve_id, computed['tests'])
 
         #  Wywołaj po wszystkim, ale przed komunikatem o zakończeniu
 
@@ -2233,66 +2025,14 @@ class POMOKAstat(QWidget):
         save_chart_separately = options["save_chart_separately"]
         output_format = options["output_format"]
 
-        #  **Tworzenie jednego folderu na raport, wykresy i wyniki**
-        output_dir = os.path.join("plots", report_name)  # Teraz wszystko w jednym folderze
-        os.makedirs(output_dir, exist_ok=True)  #  Tworzy folder, jeśli nie istnieje
-
-        #  **Ścieżki do plików**
-        report_path = os.path.join(output_dir,
-                                   f"{report_name}.{output_format}")  # Raport w folderze `plots/{report_name}`
-        chart_image_path = os.path.join(output_dir, f"{report_name}.png")  # Wykres w tym samym folderze
-        heatmap_path = os.path.join(output_dir, f"{report_name}_heatmap.png")  # Heatmapa też
-
-        #  **Uruchomienie testów ANOVA + Tukeya**
-        anova_stat, anova_p_value, tukey_matrix, heatmap_path = self.run_anova_and_tukey_heatmap(self.data_storage,
-                                                                                                 heatmap_path)
-
-        #  **Zapisywanie wykresu**
+        #  **Raport, wykres i heatmapa w jednym folderze `plots/{report_name}`**
+        output_dir = os.path.join("plots", report_name)
         try:
-            self.canvas.figure.savefig(chart_image_path, bbox_inches="tight", dpi=150)
-            print(f"Wykres zapisany w: {chart_image_path}")
+            write_report(output_dir, report_name, output_format, self.results_storage, self.data_storage,
+                         self.canvas.figure)
         except Exception as e:
-            print(f"Błąd podczas zapisywania wykresu: {e}")
-            chart_image_path = None  # Zapobiega błędowi FileNotFoundError
-
-        # **Tworzenie PDF**
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 10, txt="Statistical Test Report", ln=True, align='C')
-
-        # **Dodanie wyników testów statystycznych (wszystkie testy, nie tylko ANOVA!)**
-        pdf.cell(200, 10, txt="Wyniki testów statystycznych:", ln=True)
-        pdf.ln(5)
-        results = self.results_storage.get_all_results()  # Pobieramy WSZYSTKIE wyniki testów
-        for test, curves in results.items():
-            pdf.cell(200, 10, txt=f"Test: {test}", ln=True)
-            for curve_id, metrics in curves.items():
-                pdf.cell(200, 10, txt=f"  Krzywa: {curve_id}", ln=True)
-                for metric, value in metrics.items():
-                    pdf.cell(200, 10, txt=f"    {metric}: {value}", ln=True)
-            pdf.ln(5)
-
-        # **Dodanie wyników ANOVA**
-        pdf.cell(200, 10, txt="ANOVA Results:", ln=True)
-        pdf.cell(200, 10, txt=f"  ANOVA F-statistic: {anova_stat:.4f}", ln=True)
-        pdf.cell(200, 10, txt=f"  ANOVA p-value: {anova_p_value:.4f}", ln=True)
-        pdf.ln(10)
-
-        # **Nie dodajemy macierzy Tukeya do PDF, zapisujemy ją osobno!**
-        #print(f"Heatmapa zapisana osobno: {heatmap_path}")
-
-        # **Dodanie wykresu do PDF**
-        if chart_image_path and os.path.exists(chart_image_path):
-            if pdf.get_y() + 100 > 270:
-                pdf.add_page()
-            pdf.image(chart_image_path, x=10, y=pdf.get_y() + 10, w=190)
-            pdf.ln(90)
-        else:
-            print("Wykres nie został znaleziony, pomijam dodanie do PDF.")
-
-        # **Zapisanie raportu PDF**
-        pdf.output(report_path)
+            CustomDialogs.showWarning(self, "Error", f"Unable to generate report: {str(e)}")
+            return
 
         # **Informacja o zakończeniu**
         CustomDialogs.showInformation(self, "Report", f"Raport i pliki zapisane w: {output_dir}")
@@ -2300,251 +2040,17 @@ class POMOKAstat(QWidget):
     def openEditChartWindow(self):
         self.openstatusEditChartWindow = 1
         if hasattr(self, 'canvas') and self.canvas is not None:
+            if getattr(self, 'editChartWindow', None) is not None:
+                self.editChartWindow.close()  # poprzedni edytor odlacza sie od canvasu
             self.editChartWindow = ChartEditorDialog(self.canvas.figure, self)
             self.editChartWindow.show()
         else:
             CustomDialogs.showWarning(self, "Error", "No chart available for editing.")
 
-    def run_anova_and_tukey_heatmap(self, data_results_storage, heatmap_path):
-        # **Pobranie danych**
-        data_groups = data_results_storage.get_all_data()
-        labels = list(data_groups.keys())
-        values = list(data_groups.values())
-
-        # **Wykonanie testu ANOVA**
-        anova_stat, anova_p_value = stats.f_oneway(*values)
-        print(f"ANOVA: Statystyka F = {anova_stat:.4f}, p-value = {anova_p_value:.4f}")
-
-        if anova_p_value >= 0.05:
-            print("Brak istotnych różnic między grupami.")
-            return anova_stat, anova_p_value, None, None  # ✅ Jeśli brak różnic, zwracamy None
-
-        # **Wykonanie testu Tukeya**
-        print("ANOVA wykazała istotne różnice – uruchamiam test Tukeya HSD...")
-        data = []
-        group_labels = []
-        for label, values in data_groups.items():
-            data.extend(values)
-            group_labels.extend([label] * len(values))
-
-        tukey = pairwise_tukeyhsd(np.array(data), np.array(group_labels), alpha=0.05)
-
-        print("Tabela wyników Tukeya:")
-        for result in tukey.summary().data:
-            print(result)  # Wyświetla każdą linię wyników
-
-        # **Tworzenie macierzy Tukeya**
-        tukey_matrix = pd.DataFrame(index=labels, columns=labels, dtype=float)
-        for result in tukey.summary().data[1:]:
-            g1, g2, _, p, _, *_ = result
-            tukey_matrix.loc[g1, g2] = p
-            tukey_matrix.loc[g2, g1] = p  # Teraz obie połowy są wypełnione
-
-        # **Zapisywanie heatmapy**
-        try:
-            plt.figure(figsize=(8, 6))
-            sns.heatmap(tukey_matrix, annot=True, cmap="coolwarm", center=0.05, linewidths=0.5, vmin=0, vmax=1)
-            plt.title("Macierz testu Tukeya (p-value)")
-            plt.savefig(heatmap_path, bbox_inches="tight", dpi=150)
-            plt.close()
-            print(f"Heatmapa zapisana w: {heatmap_path}")
-        except Exception as e:
-            print(f"Błąd podczas zapisywania heatmapy: {e}")
-            heatmap_path = None
-
-        return anova_stat, anova_p_value, tukey_matrix, heatmap_path
-
-        try:
-            plt.figure(figsize=(8, 6))
-            sns.heatmap(tukey_matrix, annot=True, cmap="coolwarm", center=0.05, linewidths=0.5, vmin=0, vmax=1)
-            plt.title("Macierz testu Tukeya (p-value)")
-            plt.savefig(heatmap_path, bbox_inches="tight", dpi=150)
-            plt.close()
-            print(f"Heatmapa zapisana w: {heatmap_path}")
-        except Exception as e:
-            print(f"Błąd podczas zapisywania heatmapy: {e}")
-            heatmap_path = None  # Unikamy błędu FileNotFoundError
-
-        return anova_stat, anova_p_value, tukey_matrix, heatmap_path  # Teraz zawsze zwracamy poprawną ścieżkę
-
-    def run_AUC(self, curve_id):  # porównanie pól pod krzywymi
-        time_points_ill = self.time_points
-        survival_probabilities_ill = self.survival_probabilities
-
-        time_points_gus = self.x_data_trimmed
-        survival_probabilities_gus = self.y_data_probability_trimmed
-
-        # Wyświetlenie wartości time_points_ill i survival_probabilities_ill
-        # print("Time Points (ILL):", time_points_ill)
-        # print("Survival Probabilities (ILL):", survival_probabilities_ill)
-
-        # Opcjonalnie: sprawdzenie długości tablic
-        # print("Length of Time Points (ILL):", len(time_points_ill))
-        # print("Length of Survival Probabilities (ILL):", len(survival_probabilities_ill))
-
-        # Wyświetlenie wartości time_points_gus i survival_probabilities_gus
-        # print("Time Points (gus):", time_points_gus)
-        # print("Survival Probabilities (gus):", survival_probabilities_gus)
-
-        # Opcjonalnie: sprawdzenie długości tablic
-        # print("Length of Time Points (gus):", len(time_points_gus))
-        # print("Length of Survival Probabilities (gus):", len(survival_probabilities_gus))
-
-        auc_ill = np.trapz(survival_probabilities_ill, x=time_points_ill)
-        auc_gus = np.trapz(survival_probabilities_gus, x=time_points_gus)
-        auc_diff = abs(auc_ill - auc_gus)
-
-        # print(f"AUC_gus:{auc_gus}")
-        # print(f"AUC_ill:{auc_ill}")
-        # print(f"AUC_diff:{auc_diff}")
-
-        # Formatowanie liczb do trzech miejsc po przecinku
-        formatted_auc_ill = f"{auc_ill:.3f}"
-        formatted_auc_gus = f"{auc_gus:.3f}"
-        formatted_auc_diff = f"{auc_diff:.3f}"
-
-        self.results_storage.add_result("AUC", curve_id, {"AUC_ILL": formatted_auc_ill, "AUC_GUS": formatted_auc_gus,
-                                                          "AUC_DIFF": formatted_auc_diff})
-
-
-        # Ustawianie tekstu z poprawnym formatowaniem
-        self.resultCmb.addItem(f"AUC test: Chorzy = {formatted_auc_ill},GUS = {formatted_auc_gus}, Roznica= {formatted_auc_diff}")
-
-
-        # Informacja w okienku dialogowym
-
-        all_results = self.results_storage.get_all_results()
-        print("Wszystkie wyniki:", all_results)
-
-    def run_AUC_interpolated(self, curve_id):  # porównanie pól pod krzywymi
-        time_points_ill = self.time_points  # wiecej puntkow
-        survival_probabilities_ill = self.survival_probabilities
-
-        time_points_gus = self.x_data_trimmed  # mniej punktow
-        survival_probabilities_gus = self.y_data_probability_trimmed
-
-        interpolator = interp1d(time_points_gus, survival_probabilities_gus, kind='linear', fill_value="extrapolate")
-        survival_probabilities_gus_interpolated = interpolator(time_points_ill)
-
-        # Opcjonalnie: sprawdzenie długości tablic
-        #print("Length of Time Points (ILL):", len(time_points_ill))
-        #print("Length of Survival Probabilities (ILL):", len(survival_probabilities_ill))
-
-        #print("Length of Time Points (ILL):", len(time_points_gus))
-        #print("Length of Survival Probabilities (ILL):", len(survival_probabilities_gus))
-
-        # print("Length of Time Points (gus_inter):", len(survival_probabilities_gus_interpolated))
-        # print("Length of Survival Probabilities (gus_inter):", len(survival_probabilities_gus_interpolated))
-
-        #print("AUC - Time Points ILL:", time_points_ill)
-        #print("AUC - Survival Probabilities ILL:", survival_probabilities_ill)
-
-        #print("AUC - Time Points GUS (interpolated):", time_points_ill)
-        #print("AUC - Survival Probabilities GUS (interpolated):", survival_probabilities_gus_interpolated)
-
-        auc_ill = np.trapz(survival_probabilities_ill, x=time_points_ill)
-        auc_gus = np.trapz(survival_probabilities_gus_interpolated, x=time_points_ill)
-        auc_diff = abs(auc_ill - auc_gus)
-
-        # Formatowanie liczb do trzech miejsc po przecinku
-        formatted_auc_ill = f"{auc_ill:.3f}"
-        formatted_auc_gus = f"{auc_gus:.3f}"
-        formatted_auc_diff = f"{auc_diff:.3f}"
-
-        self.results_storage.add_result("AUC interpolated", curve_id,
-                                        {"AUC_ILL": formatted_auc_ill, "AUC_GUS": formatted_auc_gus,
-                                         "AUC_DIFF": formatted_auc_diff})
-
-
-        self.resultCmb.addItem(f"AUC test interpolated: Chorzy = {formatted_auc_ill},GUS = {formatted_auc_gus}, Roznica= {formatted_auc_diff}"
-        )
-        all_results = self.results_storage.get_all_results()
-        #print("Wszystkie wyniki:", all_results)
-
-    def run_KS_test(self, curve_id):
-
-        survival_probabilities_ill = self.survival_probabilities
-        survival_probabilities_gus = self.y_data_probability_trimmed
-
-        ks_stat, p_value = ks_2samp(survival_probabilities_gus, survival_probabilities_ill)
-
-        self.results_storage.add_result("KS test", curve_id, {"KS_stat": ks_stat, "P-value": p_value})
-
-        self.resultCmb.addItem(f"Kolomorow Smirnow test: Statystyka KS = {ks_stat}, p-value = {p_value}")
-
-        all_results = self.results_storage.get_all_results()
-        #print("Wszystkie wyniki:", all_results)
-
-    def run_KS_test_interpolated(self, curve_id):
-
-        time_points_ill = self.time_points
-        time_points_gus = self.x_data_trimmed
-        survival_probabilities_ill = self.survival_probabilities
-        survival_probabilities_gus = self.y_data_probability_trimmed
-
-        interpolator = interp1d(time_points_gus, survival_probabilities_gus, kind='linear', fill_value="extrapolate")
-        survival_probabilities_gus_interpolated = interpolator(time_points_ill)
-
-        ks_stat, p_value = ks_2samp(survival_probabilities_gus_interpolated, survival_probabilities_ill)
-
-        self.results_storage.add_result("KS test interpolated", curve_id, {"KS_stat": ks_stat, "P-value": p_value})
-
-        self.resultCmb.addItem(f"Kolomorow Smirnow test interpolated: Statystyka KS = {ks_stat}, p-value = {p_value}")
-
-        all_results = self.results_storage.get_all_results()
-        #print("Wszystkie wyniki:", all_results)
-
-    def run_mean_diff(self, curve_id):
-        time_points_ill = self.time_points  # wiecej puntkow
-        survival_probabilities_ill = self.survival_probabilities
-
-        time_points_gus = self.x_data_trimmed  # mniej punktow
-        survival_probabilities_gus = self.y_data_probability_trimmed
-
-        interpolator = interp1d(time_points_gus, survival_probabilities_gus, kind='linear', fill_value="extrapolate")
-        survival_probabilities_gus_interpolated = interpolator(time_points_ill)
-
-        diff = np.mean(np.abs(survival_probabilities_ill - survival_probabilities_gus_interpolated))
-        print("ID:", curve_id, "diff:", diff)
-        # Dodanie wyniku dla każdej krzywej
-
-        self.results_storage.add_result("Mean diff test", curve_id, {"Mean_diff": diff})
-
-        self.resultCmb.addItem(f"Srednia roznica pomiedzy punktami wykresu: srednia roznica = {diff}")
-
-
-        all_results = self.results_storage.get_all_results()
-        print("Wszystkie wyniki:", all_results)
-
-    def run_mann_whitney_u(self, curve_id):
-        time_points_ill = self.time_points  # wiecej puntkow
-        survival_probabilities_ill = self.survival_probabilities
-        #print(f"Time_points_ill: {time_points_ill}")
-        #print(f"Survival_probabilities_ill: {survival_probabilities_ill}")
-
-        time_points_gus = self.x_data_trimmed  # mniej punktow
-        survival_probabilities_gus = self.y_data_probability_trimmed
-
-        #print(f"time_points_gus: {time_points_gus}")
-        #print(f"survival_probabilities_gus: {survival_probabilities_gus}")
-
-        interpolator = interp1d(time_points_gus, survival_probabilities_gus, kind='linear', fill_value="extrapolate")
-        survival_probabilities_gus_interpolated = interpolator(time_points_ill)
-        #print(f"Suv_gur_interpolated = {survival_probabilities_gus_interpolated}")
-
-        stat, p_value = mannwhitneyu(survival_probabilities_gus_interpolated, survival_probabilities_ill,
-                                     alternative='two-sided')
-
-        self.results_storage.add_result("Mann-Whitney U", curve_id, {"Statystyka U": stat, "P-value": p_value})
-
-        self.resultCmb.addItem(
-            f"Test Manna-Whitneya U: Statystyka U = {stat}, P-value = {p_value}")
-
-        all_results = self.results_storage.get_all_results()
-        #print("Wszystkie wyniki:", all_results)
-
     def toggleExecution(self):
-        if self.isExecuting:
+        if self.execution_task is not None:
+            self.cancelExecution()  # Break w trakcie obliczeń przerywa tylko bieżące obliczenia
+        elif self.isExecuting:
             self.breakExecution()
         else:
             self.startExecution()
@@ -2573,8 +2079,12 @@ class POMOKAstat(QWidget):
             if item.isSelected() and item.text() != "no preferences" and item.text() not in self.column_ranges:
                 CustomDialogs.showWarning(self, "Warning", f"Please set range for {item.text()} before executing.")
                 return
-        curve_id = self.ill()
+        self.ill()
+
+    def showExecution(self, computed):  # wykres pierwszej krzywej i wyniki testów po obliczeniach w tle
+        self.showIll(computed)
         if self.ill_correct == 1:
+            curve_id = computed['curve_id']
             self.setRangeBtn.setEnabled(False)
 
             self.uploadBtn.hide()
@@ -2594,20 +2104,7 @@ class POMOKAstat(QWidget):
             self.data_storage.add_data(curve_id, self.survival_probabilities)
             data_result = self.data_storage.get_all_data()
             print("wyniki data:", data_result)
-            selected_tests = [item.text() for item in self.testsList.selectedItems()]
-            for test in selected_tests:
-                if test == "AUC":
-                    self.run_AUC(curve_id)
-                elif test == "Kolomorow Smirnow":
-                    self.run_KS_test(curve_id)
-                elif test == "AUC Interpolated":
-                    self.run_AUC_interpolated(curve_id)
-                elif test == "Kolomorow Smirnow Interpolated":
-                    self.run_KS_test_interpolated(curve_id)
-                elif test == "Srednia roznica interpolated":
-                    self.run_mean_diff(curve_id)
-                elif test == "Mann-Whitney U test":
-                    self.run_mann_whitney_u(curve_id)
+            self.recordTestResults(curve_id, computed['tests'])
             CustomDialogs.showInformation(self, "test",
                                     "Execution Completed")
 
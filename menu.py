@@ -1,7 +1,23 @@
+import logging
+import multiprocessing
+import threading
+
 from PySide6.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QMessageBox, QTextEdit
 from PySide6.QtGui import QIcon, QFont, QDesktopServices, QGuiApplication
-from PySide6.QtCore import Qt, QUrl
-from main import POMOKAstat
+from PySide6.QtCore import Qt, QUrl, QTimer
+
+# Okno startowe importuje tylko PySide6 - okno analizy (main: pandas, matplotlib, pyarrow) i biblioteki
+# testow (scipy, statsmodels) laduje warmUp w tle, gdy okno startowe jest juz widoczne.
+
+
+def warmUp():
+    import main  # tylko import w tle, okno tworzy openStatApp
+    from engine import warm_up
+    warm_up(pool=False)  # bez procesow puli - te startuja po wczytaniu danych
+
+
+def startWarmUp():
+    threading.Thread(target=warmUp, daemon=True).start()
 
 class POMOKAstartup(QWidget):
     def __init__(self):
@@ -132,8 +148,14 @@ class POMOKAstartup(QWidget):
 
     def openStatApp(self):
 
-        self.StatApp = POMOKAstat()
-        self.StatApp.show()
+        # jesli import z warmUp jeszcze trwa, czekamy na niego (blokada importu) zamiast importowac drugi raz
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            from main import POMOKAstat
+            self.StatApp = POMOKAstat()
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.StatApp.show()  # procesy puli obliczen startuja dopiero po wczytaniu danych (applyLoadedData)
 
     def updateShadowColor(self):
 
@@ -281,18 +303,13 @@ class InstructionsWindow(QWidget):
                 self.instructions_text.setMarkdown(content)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # procesy puli obliczen w wersji zbudowanej cx_Freeze
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  # komunikaty raportu w konsoli, jak w cli.py
 
     app = QApplication([])
     app.setFont(QFont('Roboto', 14))
     startup = POMOKAstartup()
     startup.show()
+    QTimer.singleShot(0, startWarmUp)  # po narysowaniu okna startowego
     app.exec()
 
-
-print('wprowadz swoje imie')
-x = input()
-if x < 9:
-    x += 1
-    print(x)
-else:
-    print(x)
\ No newline at end of file
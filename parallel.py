@@ -0,0 +1,127 @@
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_pool = None
+_pool_lock = threading.Lock()  # warm_up_pool dziala w watku w tle - pula tworzona tylko raz
+_warmed = set()  # moduly juz ladowane w procesach puli
+
+
+def process_pool():
+    """Wspolna pula procesow do obliczen (testy, replikacje bootstrap); tworzona przy pierwszym uzyciu.
+
+    Procesy startuja przez spawn - fork procesu z watkami Qt nie jest bezpieczny, a na Windows
+    i tak jest to jedyna metoda.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def _import_modules(names):
+    for name in names:
+        importlib.import_module(name)
+
+
+def warm_up_pool(modules=()):
+    """Uruchamia procesy puli z wyprzedzeniem i laduje w kazdym modules (np. scipy dla testow).
+
+    Start procesu spawn i import bibliotek trwa sekundy - bez rozgrzania placi za to pierwsze obliczenie.
+    Zwraca futures zadan (nie trzeba na nie czekac); moduly juz rozgrzane nie sa zlecane ponownie.
+    """
+    with _pool_lock:
+        modules = [name for name in modules if name not in _warmed]
+        _warmed.update(modules)
+    if not modules and _pool is not None:
+        return []
+    pool = process_pool()
+    try:
+        return [pool.submit(_import_modules, modules) for _ in range(os.cpu_count() or 1)]
+    except RuntimeError:  # pula zamknieta przy wyjsciu z programu, zanim watek rozgrzewania zdazyl zlecic zadania
+        return []
+
+
+class SharedArrays:
+    """Tablice tylko do odczytu w pamieci wspoldzielonej - procesy puli czytaja je bez serializacji i kopii.
+
+    with SharedArrays({'matrices': matrices}) as shared:
+        executor.submit(run_shared, fn, shared.spec, ...)   # w procesie: fn({'matrices': ...}, ...)
+    Bloki sa usuwane przy wyjsciu z with, wiec wyniki trzeba zebrac wewnatrz bloku.
+    """
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_shared(fn, spec, *args):
+    """Wywolanie fn(tablice, *args) w procesie puli na tablicach z SharedArrays.spec.
+
+    Wynik fn nie moze wskazywac na pamiec wspoldzielona (bloki sa zamykane po obliczeniach).
+    """
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, (block_name, _, _) in spec.items()}
+    try:
+        arrays = {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=blocks[name].buf)
+                  for name, (_, shape, dtype) in spec.items()}
+        result = fn(arrays, *args)
+        del arrays
+        return result
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+def cancel(futures):
+    """Anuluje zadania, ktore jeszcze nie ruszyly, i czeka na te w trakcie.
+
+    Po powrocie zadne zadanie nie czyta juz pamieci wspoldzielonej, wiec SharedArrays mozna zamknac.
+    """
+    for future in futures:
+        future.cancel()
+    wait(futures)
+
+
+def gather(futures, progress=None, unit=''):
+    """Wyniki zadan w kolejnosci futures; progress(gotowe, wszystkie, unit) co najwyzej co 0.2 s.
+
+    Wyjatek z progress (np. przerwanie przez uzytkownika) anuluje zadania, ktore jeszcze nie ruszyly,
+    i czeka na zakonczenie biezacych.
+    """
+    pending = set(futures)
+    try:
+        while pending:
+            if progress is not None:
+                progress(len(futures) - len(pending), len(futures), unit)
+            _, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+    except BaseException:
+        cancel(pending)
+        raise
+    return [future.result() for future in futures]
@@ -1,116 +1,158 @@
 import openpyxl
 import os
-from openpyxl import Workbook, load_workbook
+import json
+from openpyxl import Workbook
 import pandas as pd
-import matplotlib.pyplot as plt
-
-def prepare_data(file_path):
-    wiersze = 101  # w jednej zakladce 100 wiersz dla plci
-    kolumny = 17    #liczba punktow
-    tab_m = [[None] * kolumny for _ in range(wiersze)]
-    tab_k = [[None] * kolumny for _ in range(wiersze)]
-
-    wb = openpyxl.load_workbook(file_path)
-
-    #liczba zakladek
-    liczba_zakladek = 17 #(od 2006)
-
-    # Iteracja przez zakładki
-    for i in range(2006, 2006 + liczba_zakladek):
-        # Składanie nazwy zakładki
-        nazwa_zakladki = f'{i}'
-
-        # Wybór zakładki
-        sheet = wb[nazwa_zakladki]
-
-        # Przetwarzanie danych dla mężczyzn
-        for j in range(5, 106):
-            wiersz = j
-            kolumna = 'D'
-            wartosc = sheet[f'{kolumna}{wiersz}'].value
-            if wartosc is not None:
-                tab_m[j - 5][i - 2006] = 1 - wartosc
-
-        # Przetwarzanie danych dla kobiet
-        for j in range(106, 207):
-            wiersz = j
-            kolumna = 'D'
-            wartosc = sheet[f'{kolumna}{wiersz}'].value
-            if wartosc is not None:
-                tab_k[j - 106][i - 2006] = 1 - wartosc
-
-    # Debugowanie - drukowanie wartości w tab_m i tab_k
-    # print("Dane mężczyzn (tab_m):")
-    # for row in tab_m:
-    #     print(row)
-    #
-    # print("Dane kobiet (tab_k):")
-    # for row in tab_k:
-    #     print(row)
+import numpy as np
+from matplotlib.figure import Figure
+
+# tablice po preprocessingu: 0 - mezczyzni, 1 - kobiety, 2 - ogolne
+PREPROCESSED_FILES = {
+    0: 'data/preprocessed_male.xlsx',
+    1: 'data/preprocessed_female.xlsx',
+    2: 'data/preprocessed_general.xlsx',
+}
+CACHE_DIR = os.path.join('data', 'cache')
+# kolejne wydania tablic GUS: data/releases/<rok>/preprocessed_*.xlsx
+RELEASES_DIR = os.path.join('data', 'releases')
+REFERENCE_YEAR = 2022      # rok wydania tablic z PREPROCESSED_FILES
+LICZBA_ZAKLADEK = 17       # liczba lat (zakladek) uzywanych do jednego wydania
+
+POPULATION_FIRST_ROW = 5   # pierwszy wiersz danych (mezczyzni, wiek 0)
+LICZBA_WIEKOW = 101        # wiek 0-100 dla jednej plci
+
+
+def read_population_data(file_path, first_year=REFERENCE_YEAR - LICZBA_ZAKLADEK + 1, last_year=REFERENCE_YEAR):
+    """Wczytuje kolumne D (qx) wszystkich zakladek lat w jednym przebiegu.
+
+    Zwraca tablice (lata x wiek x plec) z prawdopodobienstwem przezycia 1 - qx;
+    plec 0 - mezczyzni, 1 - kobiety, NaN gdy brak wartosci w arkuszu.
+    """
+    liczba_zakladek = last_year - first_year + 1
+    data = np.full((liczba_zakladek, LICZBA_WIEKOW, 2), np.nan)
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for k, year in enumerate(range(first_year, last_year + 1)):
+            sheet = wb[f'{year}']
+            kolumna = np.full(2 * LICZBA_WIEKOW, np.nan)
+            wartosci = [row[0] for row in sheet.iter_rows(min_row=POPULATION_FIRST_ROW,
+                                                          max_row=POPULATION_FIRST_ROW + 2 * LICZBA_WIEKOW - 1,
+                                                          min_col=4, max_col=4, values_only=True)]
+            kolumna[:len(wartosci)] = np.array(wartosci, dtype=np.float64)  # None -> NaN
+            data[k] = 1 - kolumna.reshape(2, LICZBA_WIEKOW).T
+    finally:
+        wb.close()
+
+    return data
+
+
+def prepare_data(file_path, last_year=REFERENCE_YEAR):
+    data = read_population_data(file_path, last_year - LICZBA_ZAKLADEK + 1, last_year)
+
+    # macierze wiek x rok (od last_year - 16), None dla brakujacych wartosci
+    tab_m = [[None if np.isnan(v) else v for v in row] for row in data[:, :, 0].T.tolist()]
+    tab_k = [[None if np.isnan(v) else v for v in row] for row in data[:, :, 1].T.tolist()]
 
     return tab_m, tab_k
 
 
-def dane_wykresy(macierz):
-    wiersze = len(macierz)
-    kolumny = len(macierz[0])
-    dane_wykres = []
+def _przekatne(macierz):
+    """Indeksy przekatnych macierzy (wiek x rok) w kolejnosci rocznikow: od (0, kolumny-1) do (wiersze-1, 0)."""
+    wiersze, kolumny = macierz.shape
+    offsets = np.arange(kolumny - 1, -wiersze, -1)
+    punkty = np.arange(min(wiersze, kolumny))
+    i = np.maximum(-offsets, 0)[:, None] + punkty
+    j = np.maximum(offsets, 0)[:, None] + punkty
+    return i, j, (i < wiersze) & (j < kolumny)
 
-    # Od prawego górnego rogu do lewego dolnego rogu
-    for k in range(kolumny - 1, -1, -1):
-        dane = []
-        i, j = 0, k
-        while j < kolumny and i < wiersze:
-            if macierz[i][j] is not None:  # Ignorowanie wartości None
-                dane.append(macierz[i][j])
-            i += 1
-            j += 1
-        print(f"Przekątna od (0, {k}) do końca: {dane}")
-        if dane:  # Dodawanie tylko niepustych list
-            dane_wykres.append(dane)
 
-    # Od drugiego wiersza do ostatniego
-    for k in range(1, wiersze):
-        dane = []
-        i, j = k, 0
-        while i < wiersze and j < kolumny:
-            if macierz[i][j] is not None:  # Ignorowanie wartości None
-                dane.append(macierz[i][j])
-            i += 1
-            j += 1
-        print(f"Przekątna od ({k}, 0) do końca: {dane}")
+def dane_wykresy(macierz, quiet=False):
+    macierz = np.array(macierz, dtype=np.float64)  # None -> NaN
+    wiersze, kolumny = macierz.shape
+    dane_wykres = []
+
+    # Od prawego górnego rogu do lewego dolnego rogu, potem od drugiego wiersza do ostatniego
+    for offset in range(kolumny - 1, -wiersze, -1):
+        dane = np.diagonal(macierz, offset=offset)
+        dane = dane[~np.isnan(dane)].tolist()  # Ignorowanie brakujących wartości
+        if not quiet:
+            start = (0, offset) if offset >= 0 else (-offset, 0)
+            print(f"Przekątna od {start} do końca: {dane}")
         if dane:  # Dodawanie tylko niepustych list
             dane_wykres.append(dane)
 
     return dane_wykres
 
 
+def cohort_survival(macierz):
+    """Przezycie rocznikow [%] jako macierz (rocznik x punkt), wiersze od najmlodszego rocznika.
+
+    Przekatne macierzy (wiek x rok) sa wyciagane jedna operacja na indeksach, brakujace
+    wartosci pomijane (jak w dane_wykresy), a prawdopodobienstwa mnozone przez np.cumprod.
+    Pozycje poza dlugoscia przekatnej maja wartosc NaN.
+    """
+    macierz = np.array(macierz, dtype=np.float64)  # None -> NaN
+    i, j, valid = _przekatne(macierz)
+
+    diag = np.full(i.shape, np.nan)
+    diag[valid] = macierz[i[valid], j[valid]]
+
+    # przesuniecie brakujacych wartosci na koniec wiersza (stabilnie), zeby nie przerywaly iloczynu
+    order = np.argsort(np.isnan(diag), axis=1, kind='stable')
+    diag = np.take_along_axis(diag, order, axis=1)
+
+    return np.cumprod(diag, axis=1) * 100
+
+
+def general_survival(surv_m, surv_k, weights=None):
+    """Tablica ogolna z tablic mezczyzn i kobiet (rocznik x punkt).
+
+    Domyslnie srednia 50/50; gdy brakuje jednej z wartosci, brana jest druga (NaN gdy brak obu).
+    weights - opcjonalne wagi (w_m, w_k), np. liczebnosci populacji: skalary albo tablice
+    z waga dla kazdego rocznika.
+    """
+    surv_m = np.asarray(surv_m, dtype=np.float64)
+    surv_k = np.asarray(surv_k, dtype=np.float64)
+    if weights is None:
+        avg = (surv_m + surv_k) / 2
+    else:
+        w_m, w_k = (np.asarray(w, dtype=np.float64) for w in weights)
+        if w_m.ndim == 1:
+            w_m = w_m[:, None]
+        if w_k.ndim == 1:
+            w_k = w_k[:, None]
+        avg = (w_m * surv_m + w_k * surv_k) / (w_m + w_k)
+
+    avg = np.where(np.isnan(surv_m), surv_k, avg)
+    avg = np.where(np.isnan(surv_k), surv_m, avg)
+    return avg
+
 
+def _append_survival_rows(ws, years, survival):
+    for year, row in zip(years, survival):
+        valid = np.flatnonzero(~np.isnan(row))
+        values = row[:valid[-1] + 1].tolist() if len(valid) else []
+        ws.append([year] + [None if np.isnan(v) else v for v in values])
+
+
+def save_data_to_excel(file_path_men, file_path_women, file_path_a, tab_m, tab_k, weights=None,
+                       reference_year=REFERENCE_YEAR):
+    # Tablice przezycia rocznikow liczone w pamieci - kazdy plik zapisywany raz
+    surv_m = cohort_survival(tab_m)
+    surv_k = cohort_survival(tab_k)
+    surv_a = general_survival(surv_m, surv_k, weights)
+    roczniki = range(reference_year, reference_year - len(surv_m), -1)
+
+    # Dodaj nagłówki kolumn (punkty)
+    years = list(range(surv_m.shape[1]))
 
-def save_data_to_excel(file_path_men, file_path_women, file_path_a, tab_m, tab_k):
     # Zapisanie danych dla mężczyzn
     wb_m = Workbook()
     ws_m = wb_m.active
     ws_m.title = "Mężczyźni"
-
-    # Dodaj nagłówki kolumn (punkty)
-    years = list(range(0, 17))
     ws_m.append(["punkt "] + years)
-
-    # Dodaj wiersze z wiekiem (0-100)
-    for year in range(2022,1905, -1):
-        ws_m.append([year])
-    
-
-    # Dodaj dane do arkusza "Mężczyźni"
-    dane_do_wykresu_M = dane_wykresy(tab_m)
-    for row_index, row_data in enumerate(dane_do_wykresu_M, start=2):
-        probability = 1
-        for col_index, value in enumerate(row_data, start=2):
-            if value is not None:
-                probability *= value
-            ws_m.cell(row=row_index, column=col_index, value=probability * 100)
-
+    _append_survival_rows(ws_m, roczniki, surv_m)
     wb_m.save(file_path_men)
     # print(f"Dane zostały zapisane do pliku {file_path_men}")
 
@@ -118,62 +160,16 @@ def save_data_to_excel(file_path_men, file_path_women, file_path_a, tab_m, tab_k
     wb_k = Workbook()
     ws_k = wb_k.active
     ws_k.title = "Kobiety"
-
-    # Dodaj nagłówki kolumn (lata)
     ws_k.append(["punkt"] + years)
-
-    # Dodaj wiersze z wiekiem (0-100)
-    for age in range(2022, 1905, -1):
-        ws_k.append([age])
-    
-
-    # Dodaj dane do arkusza "Kobiety"
-    dane_do_wykresu_K = dane_wykresy(tab_k)
-    for row_index, row_data in enumerate(dane_do_wykresu_K, start=2):
-        probability = 1
-        for col_index, value in enumerate(row_data, start=2):
-            if value is not None:
-                probability *= value
-            ws_k.cell(row=row_index, column=col_index, value=probability * 100)
-
+    _append_survival_rows(ws_k, roczniki, surv_k)
     wb_k.save(file_path_women)
 
+    # Zapisanie średniej dla obu płci
     wb_a = Workbook()
     ws_a = wb_a.active
     ws_a.title = "Ogólne"
-
-    # Dodaj nagłówki kolumn (punkty)
-    years = list(range(0, 17))
     ws_a.append(["punkt "] + years)
-
-    # Dodaj wiersze z wiekiem (0-100)
-    for year in range(2022, 1905, -1):
-        ws_a.append([year])
-
-    wb_m = load_workbook(file_path_men)
-    ws_m = wb_m.active
-
-    wb_k = load_workbook(file_path_women)
-    ws_k = wb_k.active
-
-    # Dodaj dane do arkusza "Średnia"
-    for row in range(2, ws_m.max_row + 1):
-        for col in range(2, ws_m.max_column + 1):
-            value_m = ws_m.cell(row=row, column=col).value
-            value_k = ws_k.cell(row=row, column=col).value
-
-            # Oblicz średnią, uwzględniając brakujące dane
-            if value_m is not None and value_k is not None:
-                avg_value = (value_m + value_k) / 2
-            elif value_m is not None:
-                avg_value = value_m
-            elif value_k is not None:
-                avg_value = value_k
-            else:
-                avg_value = None
-
-            ws_a.cell(row=row, column=col, value=avg_value)
-            print(f"Średnia - Wiersz: {row}, Kolumna: {col}, Wartość: {avg_value}")
+    _append_survival_rows(ws_a, roczniki, surv_a)
     wb_a.save(file_path_a)
     print(f"Dane zostały zapisane do pliku {file_path_a}")
 
@@ -188,65 +184,274 @@ def save_data_to_excel(file_path_men, file_path_women, file_path_a, tab_m, tab_k
 # # Zapisanie danych do osobnych plików Excel
 # save_data_to_excel(file_path_men, file_path_women, tab_m, tab_k)
 
-def lineChartOne(sex, year):
-    if sex == 0:
-        path = 'data/preprocessed_male.xlsx'
-    if sex == 1:
-        path = 'data/preprocessed_female.xlsx'
-    if sex == 2:
-        path = 'data/preprocessed_general.xlsx'
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
 
+def _cache_paths(path, cache_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{name}.npy'), os.path.join(cache_dir, f'{name}.json')
+
+
+def build_cache(path, cache_dir=CACHE_DIR):
+    """Konwertuje tablice z pliku xlsx do macierzy .npy (rocznik x punkt) w katalogu cache."""
     data = pd.read_excel(path)
-    row = data[data.iloc[:, 0] == year]
+    # kolumna 0 - rocznik, kolumny 1.. - przezycie w kolejnych punktach (NaN = brak danych)
+    matrix = data.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+    npy_path, stamp_path = _cache_paths(path, cache_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = npy_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, npy_path)
+        with open(stamp_path, 'w', encoding='utf-8') as f:
+            json.dump(_source_stamp(path), f)
+    except OSError:
+        # katalog tylko do odczytu (np. zainstalowana aplikacja) - zwracamy dane bez zapisu cache
+        pass
+    return matrix
+
+
+def build_caches(cache_dir=CACHE_DIR):
+    """Przebudowuje cache dla wszystkich trzech tablic."""
+    for path in PREPROCESSED_FILES.values():
+        build_cache(path, cache_dir)
+
+
+def load_preprocessed(sex, cache_dir=CACHE_DIR, files=None):
+    """Zwraca macierz tablicy dla plci z cache; cache jest odswiezany po zmianie pliku xlsx (mtime/rozmiar)."""
+    path = (files or PREPROCESSED_FILES)[sex]
+    npy_path, stamp_path = _cache_paths(path, cache_dir)
+    try:
+        with open(stamp_path, encoding='utf-8') as f:
+            stamp = json.load(f)
+        if stamp == _source_stamp(path):
+            return np.load(npy_path)
+    except (OSError, ValueError):
+        pass
+    return build_cache(path, cache_dir)
+
+
+class LifeTable:
+    """Tablice przezycia w pamieci: gesta macierz float64, wiersz = rocznik, kolumna = punkt."""
+
+    def __init__(self, cache_dir=CACHE_DIR, files=None, reference_year=REFERENCE_YEAR):
+        self.cache_dir = cache_dir
+        self.files = files or PREPROCESSED_FILES
+        self.reference_year = reference_year
+        self._tables = {}
+        self._stacked = None
+
+    def clear(self):
+        """Usuwa wczytane tablice (np. po ponownym wygenerowaniu plikow)."""
+        self._tables.clear()
+        self._stacked = None
+
+    def _table(self, sex):
+        table = self._tables.get(sex)
+        if table is None:
+            data = load_preprocessed(sex, self.cache_dir, self.files)
+            years = data[:, 0].astype(int)
+            first_year = years.min()
+            n_rows = years.max() - first_year + 1
+
+            # wiersz macierzy = rocznik - first_year (luki w rocznikach zostaja jako NaN)
+            values = np.full((n_rows, data.shape[1] - 1), np.nan)
+            values[years - first_year] = data[:, 1:]
+            present = np.zeros(n_rows, dtype=bool)
+            present[years - first_year] = True
+
+            # sumy skumulowane po wierszach -> srednia z zakresu rocznikow w O(liczba kolumn)
+            valid = ~np.isnan(values)
+            cum_sum = np.zeros((n_rows + 1, values.shape[1]))
+            cum_sum[1:] = np.cumsum(np.where(valid, values, 0.0), axis=0)
+            cum_count = np.zeros((n_rows + 1, values.shape[1]), dtype=np.int64)
+            cum_count[1:] = np.cumsum(valid, axis=0)
+            cum_present = np.concatenate(([0], np.cumsum(present)))
+
+            table = {
+                'first_year': first_year,
+                'values': values,
+                'present': present,
+                'cum_sum': cum_sum,
+                'cum_count': cum_count,
+                'cum_present': cum_present,
+            }
+            self._tables[sex] = table
+        return table
+
+    def survival(self, sex, year):
+        """Przezycie [%] rocznika w kolejnych punktach (bez brakujacych wartosci)."""
+        table = self._table(sex)
+        row = year - table['first_year']
+        if row < 0 or row >= len(table['values']) or not table['present'][row]:
+            raise ValueError(f"Wrong year {year}.")
+        values = table['values'][row]
+        return values[~np.isnan(values)]
+
+    def _stack(self):
+        # wszystkie plcie w jednej tablicy (plec x rocznik x punkt), kolumna 0 = 100%
+        if self._stacked is None:
+            tables = [self._table(sex) for sex in (0, 1, 2)]
+            first_year = min(table['first_year'] for table in tables)
+            n_rows = max(table['first_year'] + len(table['values']) for table in tables) - first_year
+            n_cols = max(table['values'].shape[1] for table in tables) + 1
+            stack = np.full((3, n_rows, n_cols), np.nan)
+            for sex, table in enumerate(tables):
+                rows = slice(table['first_year'] - first_year, table['first_year'] - first_year + len(table['values']))
+                stack[sex, rows, 0] = np.where(table['present'], 100.0, np.nan)
+                stack[sex, rows, 1:table['values'].shape[1] + 1] = table['values']
+            self._stacked = (first_year, stack)
+        return self._stacked
+
+    def cohort_curves(self, sexes, years):
+        """Krzywe przezycia [%] dla wielu par (plec, rocznik) jednym indeksowaniem.
+
+        Zwraca macierz (pary x punkty) z kolumna 0 = 100; wiersze spoza tablicy sa NaN.
+        """
+        first_year, stack = self._stack()
+        rows = np.asarray(years, dtype=np.int64) - first_year
+        inside = (rows >= 0) & (rows < stack.shape[1])
+        curves = stack[np.asarray(sexes, dtype=np.int64), np.where(inside, rows, 0)]
+        curves[~inside] = np.nan
+        return curves
+
+    def mean_survival(self, sex, start, end):
+        """Srednie przezycie [%] rocznikow start..end; NaN w punktach bez danych."""
+        table = self._table(sex)
+        lo = max(start - table['first_year'], 0)
+        hi = min(end - table['first_year'] + 1, len(table['values']))
+        if lo >= hi or table['cum_present'][hi] == table['cum_present'][lo]:
+            raise ValueError(f"Wrong year range: {start}-{end}.")
+
+        sums = table['cum_sum'][hi] - table['cum_sum'][lo]
+        counts = table['cum_count'][hi] - table['cum_count'][lo]
+        mean = np.full(len(sums), np.nan)
+        np.divide(sums, counts, out=mean, where=counts > 0)
+        return mean
+
+
+class LifeTableStore:
+    """Wydania tablic GUS indeksowane rokiem kalendarzowym; tablice wczytywane leniwie przy pierwszym uzyciu.
+
+    Domyslne wydanie (REFERENCE_YEAR) to pliki z PREPROCESSED_FILES, kolejne leza w
+    releases_dir/<rok>/ (patrz build_release). Przy starcie skanowane sa tylko nazwy katalogow.
+    """
+
+    def __init__(self, releases_dir=RELEASES_DIR, cache_dir=CACHE_DIR):
+        self.releases_dir = releases_dir
+        self.cache_dir = cache_dir
+        self._files = {REFERENCE_YEAR: PREPROCESSED_FILES}
+        if os.path.isdir(releases_dir):
+            for entry in os.scandir(releases_dir):
+                if entry.is_dir() and entry.name.isdigit():
+                    files = _release_files(entry.path)
+                    if all(os.path.exists(path) for path in files.values()):
+                        self._files[int(entry.name)] = files
+        self.years = np.array(sorted(self._files))
+        self._tables = {}
+
+    def clear(self):
+        """Usuwa wczytane tablice wszystkich wydan."""
+        for table in self._tables.values():
+            table.clear()
+
+    def release_for(self, year):
+        """Najnowsze wydanie nie pozniejsze niz rok (dla wczesniejszych lat - najstarsze wydanie)."""
+        return int(self.releases_for(np.array([year]))[0])
+
+    def releases_for(self, years):
+        """Wydanie dla kazdego roku z tablicy (jedno searchsorted po posortowanych latach wydan)."""
+        idx = np.searchsorted(self.years, np.asarray(years), side='right') - 1
+        return self.years[np.clip(idx, 0, len(self.years) - 1)]
+
+    def table(self, release_year):
+        """LifeTable dla wydania; wczytywana przy pierwszym uzyciu."""
+        table = self._tables.get(release_year)
+        if table is None:
+            if self._files[release_year] is PREPROCESSED_FILES:
+                cache_dir = self.cache_dir
+            else:
+                cache_dir = os.path.join(self.cache_dir, str(release_year))
+            table = LifeTable(cache_dir, self._files[release_year], release_year)
+            self._tables[release_year] = table
+        return table
 
-    if row.empty:
-        raise ValueError(f"Wrong year {year}.")
+    def for_year(self, year):
+        """LifeTable pasujaca do roku kalendarzowego (np. roku operacji)."""
+        return self.table(self.release_for(year))
 
-    # Extract the row data from the second column to the end
-    row_data = row.iloc[0, 1:].dropna()
 
-    row_data = pd.concat([pd.Series([100]), row_data]).reset_index(drop=True)
+def _release_files(directory):
+    return {sex: os.path.join(directory, os.path.basename(path)) for sex, path in PREPROCESSED_FILES.items()}
 
-    # Plot the line chart
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(row_data.index, row_data.values, marker='o')
-    ax.set_xlabel("Years")
-    ax.set_ylabel("Percentage")
-    ax.grid(True)
 
-    # Return the figure object
-    return fig
+def build_release(population_file, year, releases_dir=RELEASES_DIR):
+    """Generuje tablice wydania dla roku (zakladki year-16..year) w releases_dir/<rok>/."""
+    tab_m, tab_k = prepare_data(population_file, year)  # przed utworzeniem katalogu - bledny plik go nie zostawia
+    directory = os.path.join(releases_dir, str(year))
+    os.makedirs(directory, exist_ok=True)
+    files = _release_files(directory)
+    save_data_to_excel(files[0], files[1], files[2], tab_m, tab_k, reference_year=year)
+    return files
 
-# test = lineChartOne(1, 1960)
-# test.show()
-def lineChartRange(sex, start, end):
-    if sex == 0:
-        path = 'data/preprocessed_male.xlsx'
-    if sex == 1:
-        path = 'data/preprocessed_female.xlsx'
-    if sex == 2:
-        path = 'data/preprocessed_general.xlsx'
 
-    data = pd.read_excel(path)
+def combine_curves(curves, weights):
+    """Wazona srednia krzywych (x, y) o roznej dlugosci; pomija brakujace wartosci."""
+    length = max(len(y) for _, y in curves)
+    values = np.full((len(curves), length), np.nan)
+    for row, (_, y) in enumerate(curves):
+        values[row, :len(y)] = y
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64)[:, None], values.shape)
+
+    valid = ~np.isnan(values)
+    total = np.where(valid, weights, 0.0).sum(axis=0)
+    y = np.full(length, np.nan)
+    np.divide(np.where(valid, values * weights, 0.0).sum(axis=0), total, out=y, where=total > 0)
+    return np.arange(length), y
 
-    rows = data[(data.iloc[:, 0] >= start) & (data.iloc[:, 0] <= end)]
 
-    if rows.empty:
-        raise ValueError(f"Wrong year range: {start}-{end}.")
+_life_table = LifeTable()
 
-    avg_data = rows.iloc[:, 1:].apply(pd.to_numeric, errors='coerce').mean(skipna=True)
 
-    avg_data = pd.concat([pd.Series([100]), avg_data]).reset_index(drop=True)
-    #print(avg_data)
+def survival_curve(sex, year, life_table=None):
+    """Krzywa przezycia rocznika jako tablice (x, y): x - punkty, y - przezycie [%] (y[0] = 100)."""
+    if life_table is None:
+        life_table = _life_table
+    y = np.concatenate(([100.0], life_table.survival(sex, year)))
+    return np.arange(len(y)), y
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(avg_data.index, avg_data.values, marker='o')
+
+def mean_survival_curve(sex, start, end, life_table=None):
+    """Srednia krzywa przezycia dla rocznikow start..end jako tablice (x, y)."""
+    if life_table is None:
+        life_table = _life_table
+    y = np.concatenate(([100.0], life_table.mean_survival(sex, start, end)))
+    return np.arange(len(y)), y
+
+
+def plot_survival_curve(x, y, ax=None):
+    """Rysuje krzywa na podanej osi; bez osi tworzy Figure spoza menedzera pyplot (nie trzeba jej zamykac)."""
+    if ax is None:
+        fig = Figure(figsize=(10, 6))
+        ax = fig.add_subplot()
+    ax.plot(x, y, marker='o')
     ax.set_xlabel("Years")
     ax.set_ylabel("Percentage")
     ax.grid(True)
+    return ax.figure
 
 
-    return fig
+def lineChartOne(sex, year):
+    return plot_survival_curve(*survival_curve(sex, year))
+
+# test = lineChartOne(1, 1960)
+# test.savefig('test.png')
+def lineChartRange(sex, start, end):
+    return plot_survival_curve(*mean_survival_curve(sex, start, end))
 
 # test2 = lineChartRange(1, 1960, 1970)
-# test2.show()
+# test2.savefig('test2.png')
@@ -0,0 +1,161 @@
+import numpy as np
+
+from parallel import SharedArrays, gather, run_shared
+
+MONTH = 1 / 12
+
+
+def shared_grid(last_time, step=MONTH):
+    """Wspolna siatka czasu [lata] od 0 do last_time co step."""
+    return np.arange(int(np.floor(last_time / step + 1e-9)) + 1) * step
+
+
+def step_values(times, survival, grid):
+    """Wartosci funkcji schodkowej (np. krzywej KM) w punktach siatki; przed pierwszym punktem = 1."""
+    times = np.asarray(times, dtype=np.float64)
+    survival = np.asarray(survival, dtype=np.float64)
+    idx = np.searchsorted(times, grid, side='right') - 1
+    return np.where(idx >= 0, survival[np.clip(idx, 0, None)], 1.0)
+
+
+def observed_expected_ratio(km_times, km_survival, pop_times, pop_survival, grid):
+    """Przezycie wzgledne: KM pacjentow / przezycie populacji na wspolnej siatce.
+
+    km_* - tablice z ill() (survival_function_), pop_* - krzywa z gus() (prawdopodobienstwa 0-1,
+    interpolowane liniowo jak w testach *_interpolated). Zwraca (observed, expected, ratio).
+    """
+    observed = step_values(km_times, km_survival, grid)
+    expected = np.interp(grid, pop_times, pop_survival)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = observed / expected
+    return observed, expected, ratio
+
+
+def _log_expected(expected_curves, grid):
+    # log S_i(t) liniowo miedzy pelnymi latami (stala stopa zgonow populacji w roku)
+    with np.errstate(divide='ignore'):
+        log_curves = np.log(np.asarray(expected_curves, dtype=np.float64))
+    year = np.minimum(np.floor(grid).astype(np.int64), log_curves.shape[1] - 1)
+    nxt = np.minimum(year + 1, log_curves.shape[1] - 1)
+    frac = grid - year
+    return log_curves[:, year] + frac * (log_curves[:, nxt] - log_curves[:, year])
+
+
+def _grid_matrices(times, events, grid, expected_curves=None):
+    """Macierze (pacjent x przedzial siatki), ktorych sumy po pacjentach daja wszystkie estymatory.
+
+    Przedzial j = (grid[j], grid[j + 1]]; w ryzyku - czas > grid[j]; zdarzenie - zgon w przedziale.
+    Kolumny: [w ryzyku (cenzurowani wewnatrz przedzialu liczeni w polowie, jak w tablicach trwania zycia) |
+    zdarzenia] oraz dla Pohar-Perme [w ryzyku / S_i | zdarzenia / S_i |
+    w ryzyku / S_i * przyrost skumulowanego hazardu populacji].
+    """
+    times = np.asarray(times, dtype=np.float64)[:, None]
+    events = np.asarray(events, dtype=bool)[:, None]
+    start, end = grid[None, :-1], grid[None, 1:]
+
+    at_risk = (times > start).astype(np.float64)
+    in_interval = (times > start) & (times <= end)
+    died = (events & in_interval).astype(np.float64)
+    # cenzurowani na koncu przedzialu zostaja w ryzyku (jak w KM: przy rownych czasach najpierw zgony)
+    censored_inside = ~events & (times > start) & (times < end)
+    blocks = [at_risk - 0.5 * censored_inside, died]
+
+    if expected_curves is not None:
+        log_s = _log_expected(expected_curves, grid)
+        weight = np.exp(-log_s[:, :-1])
+        pop_hazard = log_s[:, :-1] - log_s[:, 1:]
+        blocks += [at_risk * weight, died * weight, at_risk * weight * pop_hazard]
+
+    return np.hstack(blocks)
+
+
+def _estimates(sums, n_intervals):
+    """Z sum po pacjentach (replikacje x kolumny) liczy KM na siatce i przezycie netto Pohar-Perme."""
+    blocks = [sums[:, k * n_intervals:(k + 1) * n_intervals] for k in range(sums.shape[1] // n_intervals)]
+    ones = np.ones((sums.shape[0], 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed = np.hstack([ones, np.cumprod(1 - blocks[1] / blocks[0], axis=1)])
+        net = None
+        if len(blocks) == 5:
+            excess = (blocks[3] - blocks[4]) / blocks[2]
+            net = np.hstack([ones, np.exp(-np.cumsum(excess, axis=1))])
+    return observed, net
+
+
+def _valid_patients(times, events, expected_curves):
+    keep = ~np.isnan(np.asarray(times, dtype=np.float64))
+    if expected_curves is not None:
+        keep &= ~np.isnan(np.asarray(expected_curves)[:, 0])
+        expected_curves = np.asarray(expected_curves)[keep]
+    return np.asarray(times, dtype=np.float64)[keep], np.asarray(events)[keep], expected_curves
+
+
+def net_survival(times, events, expected_curves, grid):
+    """Przezycie netto estymatorem Pohar-Perme na siatce.
+
+    expected_curves - oczekiwane przezycie kazdego pacjenta w pelnych latach (expected_survival.matched_curves).
+    """
+    times, events, expected_curves = _valid_patients(times, events, expected_curves)
+    matrices = _grid_matrices(times, events, grid, expected_curves)
+    return _estimates(matrices.sum(axis=0)[None, :], len(grid) - 1)[1][0]
+
+
+def _bootstrap_chunk(matrices, n_intervals, size, seed):
+    """Estymatory dla size replikacji bootstrap (generator liczb losowych z wlasnego ziarna paczki)."""
+    rng = np.random.default_rng(seed)
+    n_patients = matrices.shape[0]
+    # krotnosci wylosowania pacjentow w kazdej replikacji
+    draws = rng.integers(0, n_patients, size=(size, n_patients)) + np.arange(size)[:, None] * n_patients
+    counts = np.bincount(draws.ravel(), minlength=size * n_patients).reshape(size, n_patients)
+    return _estimates(counts.astype(np.float64) @ matrices, n_intervals)
+
+
+def _shared_bootstrap_chunk(arrays, n_intervals, size, seed):
+    return _bootstrap_chunk(arrays['matrices'], n_intervals, size, seed)
+
+
+def bootstrap_bands(times, events, grid, expected=None, expected_curves=None, n_boot=1000, alpha=0.05,
+                    seed=None, chunk=100, progress=None, executor=None):
+    """Przedzialy ufnosci bootstrap dla przezycia wzglednego i netto.
+
+    Replikacje nie powtarzaja estymacji: losowanie pacjentow ze zwracaniem to macierz krotnosci
+    (replikacje x pacjenci), a sumy dla wszystkich replikacji daje jedno mnozenie macierzy
+    z _grid_matrices. expected - przezycie populacji na siatce (do przezycia wzglednego),
+    expected_curves - krzywe pacjentow (do Pohar-Perme). progress(done, n_boot, unit) jest wywolywane
+    przed kazda paczka replikacji (pasek postepu; wyjatek z progress przerywa obliczenia).
+    executor - pula procesow (parallel.process_pool): paczki replikacji liczone rownolegle na macierzach
+    w pamieci wspoldzielonej. Kazda paczka ma ziarno z SeedSequence(seed).spawn, wiec przy ustalonym
+    seed wynik nie zalezy od tego, czy i ile procesow liczylo.
+    Zwraca slownik {'ratio': (dolna, gorna), 'net': (dolna, gorna)} z dostepnymi estymatorami.
+    """
+    times, events, expected_curves = _valid_patients(times, events, expected_curves)
+    matrices = _grid_matrices(times, events, grid, expected_curves)
+    n_intervals = len(grid) - 1
+    sizes = [min(chunk, n_boot - done) for done in range(0, n_boot, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if executor is None:
+        chunks = []
+        for done, size, child in zip(range(0, n_boot, chunk), sizes, seeds):
+            if progress is not None:
+                progress(done, n_boot, 'bootstrap samples')
+            chunks.append(_bootstrap_chunk(matrices, n_intervals, size, child))
+    else:
+        with SharedArrays({'matrices': matrices}) as shared:
+            del matrices  # procesy czytaja kopie w pamieci wspoldzielonej
+            futures = [executor.submit(run_shared, _shared_bootstrap_chunk, shared.spec, n_intervals, size, child)
+                       for size, child in zip(sizes, seeds)]
+            chunks = gather(futures, progress, 'bootstrap chunks')
+
+    observed = [obs_boot for obs_boot, _ in chunks]
+    net = [net_boot for _, net_boot in chunks if net_boot is not None]
+
+    quantiles = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    bands = {}
+    if expected is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.vstack(observed) / np.asarray(expected)[None, :]
+        bands['ratio'] = tuple(np.nanpercentile(ratio, quantiles, axis=0))
+    if net:
+        bands['net'] = tuple(np.nanpercentile(np.vstack(net), quantiles, axis=0))
+    return bands
@@ -1,11 +1,12 @@
 from cx_Freeze import setup, Executable
+import os
 import sys
 
 sys.setrecursionlimit(5000)
 
 build_exe_options = {
-    "packages": ["os", "pyarrow", "numpy", "scipy", "lifelines", "matplotlib"],
-    "includes": ["pyarrow._compute_docstrings", "numpy", "scipy.integrate", "lifelines.statistics", "lifelines.fitters", "matplotlib", "pandas.plotting._matplotlib"],
+    "packages": ["os", "pyarrow", "numpy", "scipy", "matplotlib"],
+    "includes": ["pyarrow._compute_docstrings", "numpy", "scipy.integrate", "matplotlib", "pandas.plotting._matplotlib"],
     "include_files": [
         ("data/population_data.xlsx", "data/population_data.xlsx"),
         ("data/preprocessed_male.xlsx", "data/preprocessed_male.xlsx"),
@@ -17,11 +18,15 @@ build_exe_options = {
     ],
     "excludes": ["tkinter"],
 }
+# kolejne wydania tablic GUS (build_release.py) - bez nich program uzywa tylko domyslnej tablicy
+if os.path.isdir("data/releases"):
+    build_exe_options["include_files"].append(("data/releases", "data/releases"))
 
 setup(
     name="pomoka",
     version="1.0",
     description="POMOKA",
     options={"build_exe": build_exe_options},
-    executables=[Executable("menu.py", base="Win32GUI", icon="icon.ico")],
+    executables=[Executable("menu.py", base="Win32GUI", icon="icon.ico"),
+                 Executable("cli.py", target_name="pomoka-cli", icon="icon.ico")],
 )
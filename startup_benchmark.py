@@ -0,0 +1,75 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Czas importu przy starcie programu (python -X importtime) - pilnuje, zeby okno startowe znowu nie ladowalo
+# ciezkich bibliotek przed pokazaniem sie:
+#   python startup_benchmark.py                                   # menu: budzet 500 ms, bez pandas/scipy/...
+#   python startup_benchmark.py --module main --budget 2500 --forbid scipy statsmodels seaborn fpdf
+# Kod wyjscia 1 - budzet przekroczony albo zaladowany zabroniony modul.
+
+HEAVY_MODULES = ['pandas', 'scipy', 'matplotlib', 'pyarrow', 'openpyxl', 'statsmodels', 'seaborn', 'fpdf']
+
+
+def import_times(module, python=sys.executable):
+    """Wiersze -X importtime dla 'import module': lista (modul, czas wlasny [us], czas lacznie [us], poziom)."""
+    result = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip()}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), level))
+    return rows
+
+
+def measure(module, repeat=5):
+    """Najkrotszy z repeat pomiarow (pierwszy bywa zawyzony przez zimna pamiec podreczna dysku).
+
+    Zwraca (czas importu module [ms], wiersze importtime tego importu). Start interpretera nie jest liczony.
+    """
+    best = None
+    for _ in range(repeat):
+        rows = import_times(module)
+        # importtime wypisuje modul po wszystkich jego importach - wiersze do poprzedniego modulu poziomu 0
+        end = max(i for i, (name, _, _, level) in enumerate(rows) if name == module and level == 0)
+        start = end
+        while start > 0 and rows[start - 1][3] > 0:
+            start -= 1
+        if best is None or rows[end][2] < best[0]:
+            best = (rows[end][2], rows[start:end + 1])
+    return best[0] / 1000, best[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time of a POMOKA module against a budget.")
+    parser.add_argument("--module", default="menu", help="module to import (default: menu - the start window)")
+    parser.add_argument("--budget", type=float, default=500, help="import time budget in ms (default: 500)")
+    parser.add_argument("--forbid", nargs="*", default=HEAVY_MODULES, metavar="MODULE",
+                        help="packages that must not be imported (default: the heavy scientific libraries)")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements, the fastest counts (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports to list (default: 10)")
+    args = parser.parse_args(argv)
+
+    total_ms, rows = measure(args.module, args.repeat)
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget:.0f} ms)")
+    direct = sorted((row for row in rows if row[3] == 1), key=lambda row: row[2], reverse=True)
+    for name, _, cumulative, _ in direct[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    loaded = {name.split('.')[0] for name, _, _, _ in rows}
+    forbidden = [name for name in args.forbid if name in loaded]
+    if forbidden:
+        print(f"Imported at startup, should load lazily: {', '.join(forbidden)}")
+    if total_ms > args.budget:
+        print(f"Over budget by {total_ms - args.budget:.0f} ms")
+    return 1 if forbidden or total_ms > args.budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
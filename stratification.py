@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+
+class StratificationIndex:
+    """Indeks wczytanych danych do wielokrotnego filtrowania zakresami z setRanges.
+
+    Kolumny liczbowe - posortowane wartosci i permutacja wierszy (zakres to dwa searchsorted),
+    kolumny kategoryczne - mapa wartosc -> bitmapa wierszy (np.packbits, tworzona przy pierwszym
+    zapytaniu o wartosc). Filtr to przeciecie bitmap zwracane jako tablica numerow wierszy -
+    bez kopiowania DataFrame.
+    Indeks kolumny powstaje przy pierwszym uzyciu i jest trzymany do wczytania nowego pliku.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.n_rows = len(df)
+        self._numeric = {}
+        self._categorical = {}
+        self._uniques = {}
+
+    def _sorted(self, column):
+        if column not in self._numeric:
+            values = self.df[column].to_numpy(dtype=np.float64)
+            order = np.argsort(values, kind='stable')  # NaN na koncu - poza kazdym zakresem
+            self._numeric[column] = (values[order], order)
+        return self._numeric[column]
+
+    def _groups(self, column):
+        if column not in self._categorical:
+            codes, uniques = pd.factorize(self.df[column])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self._categorical[column] = (pd.Index(uniques), order, bounds, {})
+        return self._categorical[column]
+
+    def _value_bitmap(self, column, k):
+        # bitmapy tylko dla wartosci, o ktore pytano - kolumny o wielu wartosciach nie rozdmuchuja indeksu
+        _, order, bounds, bitmaps = self._groups(column)
+        if k not in bitmaps:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[order[bounds[k]:bounds[k + 1]]] = True
+            bitmaps[k] = np.packbits(mask)
+        return bitmaps[k]
+
+    def unique_values(self, column):
+        """Unikalne wartosci kolumny (liczone raz na plik, np. do walidacji w setRanges)."""
+        if column not in self._uniques:
+            self._uniques[column] = self.df[column].unique().tolist()
+        return self._uniques[column]
+
+    def numeric_bitmap(self, column, lower, upper):
+        """Wiersze z lower <= wartosc <= upper."""
+        if not pd.api.types.is_numeric_dtype(self.df[column]) or pd.api.types.is_bool_dtype(self.df[column]):
+            # porownanie jak w pandas (w tym bledy dla kolumn tekstowych)
+            return np.packbits(((self.df[column] >= lower) & (self.df[column] <= upper)).to_numpy())
+        values, order = self._sorted(column)
+        start = np.searchsorted(values, lower, side='left')
+        stop = np.searchsorted(values, upper, side='right')
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[order[start:stop]] = True
+        return np.packbits(mask)
+
+    def categorical_bitmap(self, column, values):
+        """Wiersze, w ktorych wartosc kolumny jest na liscie (dopasowanie jak Series.isin)."""
+        uniques = self._groups(column)[0]
+        bitmap = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for k in np.flatnonzero(uniques.isin(values)):
+            bitmap |= self._value_bitmap(column, k)
+        return bitmap
+
+    def rows(self, column_ranges):
+        """Numery wierszy (rosnaco) spelniajacych wszystkie zakresy {kolumna: ('numeric'|'categorical', wartosci)}."""
+        bitmap = np.full((self.n_rows + 7) // 8, 0xFF, dtype=np.uint8)
+        for column, (range_type, values) in column_ranges.items():
+            if range_type == 'numeric':
+                bitmap &= self.numeric_bitmap(column, *values)
+            elif range_type == 'categorical':
+                bitmap &= self.categorical_bitmap(column, values)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
@@ -0,0 +1,154 @@
+import numpy as np
+
+from parallel import SharedArrays, cancel, gather, run_shared
+from relative_survival import shared_grid, observed_expected_ratio, net_survival, bootstrap_bands
+
+# Testy porownujace krzywa KM pacjentow z krzywa GUS - funkcje bez GUI i bez stanu okna.
+# curve - slownik tablic: time_points/survival (KM pacjentow), gus_times/gus_survival (populacja
+# przycieta do dlugosci KM). Kazdy test zwraca (nazwa testu, wynik do TestResultsStorage, opis do listy wynikow).
+# scipy (ok. 1 s importu) jest ladowane przy pierwszym tescie albo w engine.warm_up, nie przy starcie programu.
+
+
+def _gus_interpolated(curve):
+    # krzywa GUS (mniej punktow) w punktach czasu KM (wiecej punktow)
+    from scipy.interpolate import interp1d
+    interpolator = interp1d(curve['gus_times'], curve['gus_survival'], kind='linear', fill_value="extrapolate")
+    return interpolator(curve['time_points'])
+
+
+def auc(curve):  # porównanie pól pod krzywymi
+    auc_ill = np.trapezoid(curve['survival'], x=curve['time_points'])
+    auc_gus = np.trapezoid(curve['gus_survival'], x=curve['gus_times'])
+    auc_diff = abs(auc_ill - auc_gus)
+
+    # Formatowanie liczb do trzech miejsc po przecinku
+    formatted_auc_ill = f"{auc_ill:.3f}"
+    formatted_auc_gus = f"{auc_gus:.3f}"
+    formatted_auc_diff = f"{auc_diff:.3f}"
+    return ("AUC", {"AUC_ILL": formatted_auc_ill, "AUC_GUS": formatted_auc_gus, "AUC_DIFF": formatted_auc_diff},
+            f"AUC test: Chorzy = {formatted_auc_ill},GUS = {formatted_auc_gus}, Roznica= {formatted_auc_diff}")
+
+
+def auc_interpolated(curve):  # porównanie pól pod krzywymi, GUS w punktach KM
+    auc_ill = np.trapezoid(curve['survival'], x=curve['time_points'])
+    auc_gus = np.trapezoid(_gus_interpolated(curve), x=curve['time_points'])
+    auc_diff = abs(auc_ill - auc_gus)
+
+    formatted_auc_ill = f"{auc_ill:.3f}"
+    formatted_auc_gus = f"{auc_gus:.3f}"
+    formatted_auc_diff = f"{auc_diff:.3f}"
+    return ("AUC interpolated",
+            {"AUC_ILL": formatted_auc_ill, "AUC_GUS": formatted_auc_gus, "AUC_DIFF": formatted_auc_diff},
+            f"AUC test interpolated: Chorzy = {formatted_auc_ill},GUS = {formatted_auc_gus}, Roznica= {formatted_auc_diff}")
+
+
+def ks_test(curve):
+    from scipy.stats import ks_2samp
+    ks_stat, p_value = ks_2samp(curve['gus_survival'], curve['survival'])
+    return ("KS test", {"KS_stat": ks_stat, "P-value": p_value},
+            f"Kolomorow Smirnow test: Statystyka KS = {ks_stat}, p-value = {p_value}")
+
+
+def ks_test_interpolated(curve):
+    from scipy.stats import ks_2samp
+    ks_stat, p_value = ks_2samp(_gus_interpolated(curve), curve['survival'])
+    return ("KS test interpolated", {"KS_stat": ks_stat, "P-value": p_value},
+            f"Kolomorow Smirnow test interpolated: Statystyka KS = {ks_stat}, p-value = {p_value}")
+
+
+def mean_diff(curve):
+    diff = np.mean(np.abs(curve['survival'] - _gus_interpolated(curve)))
+    return ("Mean diff test", {"Mean_diff": diff},
+            f"Srednia roznica pomiedzy punktami wykresu: srednia roznica = {diff}")
+
+
+def mann_whitney_u(curve):
+    from scipy.stats import mannwhitneyu
+    stat, p_value = mannwhitneyu(_gus_interpolated(curve), curve['survival'], alternative='two-sided')
+    return ("Mann-Whitney U", {"Statystyka U": stat, "P-value": p_value},
+            f"Test Manna-Whitneya U: Statystyka U = {stat}, P-value = {p_value}")
+
+
+def relative_survival(curve, times, events, expected_curves=None, progress=None, executor=None):
+    """Przezycie wzgledne (i netto Pohar-Perme, gdy sa krzywe oczekiwane pacjentow) z przedzialami bootstrap.
+
+    times/events - czasy i zdarzenia pacjentow, expected_curves - expected_survival.matched_curves albo None.
+    Z krzywymi pacjentow wynik ma tez oczekiwane przezycie kohorty metoda Ederer I i Ederer II i przezycie
+    wzgledne wzgledem kazdej z nich. Replikacje bootstrap ida do executor (pula procesow), jesli podany.
+    """
+    grid = shared_grid(min(np.nanmax(times), curve['gus_times'][-1]))
+    observed, expected, ratio = observed_expected_ratio(curve['time_points'], curve['survival'],
+                                                        curve['gus_times'], curve['gus_survival'], grid)
+    result = {"Czas": grid[-1], "RS": ratio[-1]}
+    ederer = {}
+    if expected_curves is not None:
+        from expected_survival import cohort_expected, EDERER_I, EDERER_II
+        result["Net survival"] = net_survival(times, events, expected_curves, grid)[-1]
+        for method, name in ((EDERER_I, "Ederer I"), (EDERER_II, "Ederer II")):
+            years, expected_cohort = cohort_expected(expected_curves, times, method)
+            ederer[name] = np.interp(grid[-1], years, expected_cohort)  # krzywe roczne, jak krzywa GUS
+            result[f"Expected {name}"] = ederer[name]
+            result[f"RS {name}"] = observed[-1] / ederer[name]
+
+    bands = bootstrap_bands(times, events, grid, expected=expected, expected_curves=expected_curves,
+                            progress=progress, executor=executor)
+    result["RS 95% CI"] = (bands['ratio'][0][-1], bands['ratio'][1][-1])
+    message = (f"Przezycie wzgledne po {grid[-1]:.2f} latach: RS = {ratio[-1]}, "
+               f"95% CI = ({bands['ratio'][0][-1]}, {bands['ratio'][1][-1]})")
+    for name, expected_cohort in ederer.items():
+        message += f"; {name}: oczekiwane = {expected_cohort}, RS = {result[f'RS {name}']}"
+    if 'net' in bands:
+        result["Net survival 95% CI"] = (bands['net'][0][-1], bands['net'][1][-1])
+        message += (f"; przezycie netto (Pohar-Perme) = {result['Net survival']}, "
+                    f"95% CI = ({bands['net'][0][-1]}, {bands['net'][1][-1]})")
+    return "Relative survival", result, message
+
+
+# testy z listy testsList, ktore potrzebuja tylko krzywych (przezycie wzgledne potrzebuje tez pacjentow)
+CURVE_TESTS = {
+    "AUC": auc,
+    "Kolomorow Smirnow": ks_test,
+    "AUC Interpolated": auc_interpolated,
+    "Kolomorow Smirnow Interpolated": ks_test_interpolated,
+    "Srednia roznica interpolated": mean_diff,
+    "Mann-Whitney U test": mann_whitney_u,
+}
+RELATIVE_SURVIVAL = "Relative survival"
+# wszystkie testy w kolejnosci listy testsList
+TEST_NAMES = ["Mann-Whitney U test", "AUC", "AUC Interpolated", "Kolomorow Smirnow", "Kolomorow Smirnow Interpolated",
+              "Srednia roznica interpolated", RELATIVE_SURVIVAL]
+
+
+def _shared_curve_test(arrays, name):
+    return CURVE_TESTS[name](arrays)
+
+
+def run_tests(names, curve, patients=None, progress=None, executor=None):
+    """Wyniki testow names (nazwy z testsList) w kolejnosci names; nieznane nazwy sa pomijane.
+
+    patients - (times, events, expected_curves) do przezycia wzglednego. Z executor kazdy test krzywych
+    jest osobnym zadaniem puli (tablice krzywych w pamieci wspoldzielonej), a przezycie wzgledne
+    w tym czasie rozdziela na pule replikacje bootstrap; bez executor testy licza sie po kolei.
+    """
+    curve_tests = [name for name in names if name in CURVE_TESTS]
+    relative = RELATIVE_SURVIVAL in names and patients is not None
+    results = {}
+    if executor is None:
+        for done, name in enumerate(curve_tests):
+            if progress is not None:
+                progress(done, len(curve_tests), 'tests')
+            results[name] = CURVE_TESTS[name](curve)
+        if relative:
+            results[RELATIVE_SURVIVAL] = relative_survival(curve, *patients, progress=progress)
+    else:
+        with SharedArrays(curve) as shared:
+            futures = [executor.submit(run_shared, _shared_curve_test, shared.spec, name) for name in curve_tests]
+            try:
+                if relative:
+                    results[RELATIVE_SURVIVAL] = relative_survival(curve, *patients, progress=progress,
+                                                                   executor=executor)
+            except BaseException:
+                cancel(futures)  # np. Break w trakcie bootstrap - testy nie moga czytac zwolnionej pamieci
+                raise
+            results.update(zip(curve_tests, gather(futures, progress, 'tests')))
+    return [results[name] for name in names if name in results]
@@ -0,0 +1,64 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class Cancelled(Exception):
+    """Zadanie przerwane przez uzytkownika (zglaszane z wywolania progress w watku roboczym)."""
+
+
+class TaskSignals(QObject):
+    """Sygnaly zadania - obiekt zyje w watku GUI, wiec sloty wykonuja sie w watku GUI.
+
+    progress(done, total, unit) - postep (total 0, gdy nieznany; unit np. 'rows' albo 'bytes'),
+    finished(result)            - wynik funkcji zadania,
+    failed(message)             - wyjatek zgloszony przez funkcje zadania,
+    cancelled()                 - zadanie przerwane przez cancel().
+    """
+
+    progress = Signal(object, object, str)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class Task(QRunnable):
+    """Funkcja wykonywana w QThreadPool: fn(progress, *args).
+
+    fn raportuje postep wywolujac progress(done, total, unit); po cancel() kolejne wywolanie
+    progress zglasza Cancelled, wiec funkcja konczy sie w najblizszym punkcie raportowania postepu.
+    """
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = TaskSignals()
+        self.is_cancelled = False
+        self.setAutoDelete(False)  # obiekt trzyma wlasciciel - sygnaly musza przezyc zakonczenie run()
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def progress(self, done, total=0, unit=''):
+        if self.is_cancelled:
+            raise Cancelled()
+        self.signals.progress.emit(done, total, unit)
+
+    def run(self):
+        try:
+            result = self.fn(self.progress, *self.args)
+        except Cancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            if self.is_cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.failed.emit(str(e))
+        else:
+            if self.is_cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
+
+    def start(self, pool=None):
+        (pool or QThreadPool.globalInstance()).start(self)
+        return self